@@ -1,16 +1,3 @@
-# Default modules
-import inkycal.modules.inkycal_agenda
-import inkycal.modules.inkycal_calendar
-import inkycal.modules.inkycal_feeds
-import inkycal.modules.inkycal_fullweather
-import inkycal.modules.inkycal_image
-import inkycal.modules.inkycal_jokes
-import inkycal.modules.inkycal_slideshow
-import inkycal.modules.inkycal_stocks
-import inkycal.modules.inkycal_todoist
-import inkycal.modules.inkycal_weather
-import inkycal.modules.inkycal_webshot
-import inkycal.modules.inkycal_xkcd
-import inkycal.modules.custom_pihole
+# Modules are imported on demand, see inkycal.modules.registry
 from inkycal.display import Display
 from inkycal.main import Inkycal
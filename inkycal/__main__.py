@@ -0,0 +1,68 @@
+"""Command line interface of Inkycal
+
+Usage:
+    python -m inkycal profile-startup [--settings path/to/settings.json] [--render] [--json]
+    python -m inkycal control {refresh [position],calibrate,reload,metrics,memory-report} [--socket path]
+    python -m inkycal benchmark-drivers [model ...] [--repeat 3] [--update-references] [--json]
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m inkycal", description="Inkycal command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    profile = commands.add_parser("profile-startup", help="Show where the time of a cold start goes")
+    profile.add_argument("--settings", help="path to settings.json, searches /boot if not given")
+    profile.add_argument("--render", action="store_true", help="also import and initialise the display driver")
+    profile.add_argument("--top", type=int, default=15, help="number of the slowest imports to show")
+    profile.add_argument("--json", action="store_true", help="print the result as JSON")
+
+    control = commands.add_parser("control", help="Send a command to a running Inkycal")
+    control.add_argument("action", choices=["refresh", "calibrate", "reload", "metrics", "memory-report"])
+    control.add_argument("position", nargs="?", type=int, help="refresh: only this module is generated again")
+    control.add_argument("--socket", help="path of the control socket, see control_socket in settings.json")
+
+    benchmark = commands.add_parser("benchmark-drivers", help="Benchmark the E-Paper drivers without an E-Paper")
+    benchmark.add_argument("models", nargs="*", help="models to benchmark, all SPI drivers if none are given")
+    benchmark.add_argument("--repeat", type=int, default=3, help="number of frames sent to each driver")
+    benchmark.add_argument("--update-references", action="store_true",
+                           help="store the frames sent as the new reference frames")
+    benchmark.add_argument("--json", action="store_true", help="print the result as JSON")
+
+    args = parser.parse_args()
+
+    if args.command == "profile-startup":
+        from inkycal.utils.startup_profiler import profile_startup, print_report
+        report = profile_startup(args.settings, render=args.render, top=args.top)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+
+    elif args.command == "control":
+        from inkycal.utils.control import DEFAULT_SOCKET, send_command
+        arguments = [args.position] if args.position is not None else []
+        try:
+            reply = send_command(args.action, *arguments, path=args.socket or DEFAULT_SOCKET)
+        except OSError as e:
+            sys.exit(f"Could not reach Inkycal: {e}")
+        print(json.dumps(reply, indent=2))
+        if not reply.get("ok"):
+            sys.exit(1)
+
+    elif args.command == "benchmark-drivers":
+        from inkycal.display.benchmark import benchmark_drivers, print_report
+        report = benchmark_drivers(args.models, repeat=args.repeat, update_references=args.update_references)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+        if report["mismatches"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
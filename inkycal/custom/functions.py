@@ -23,18 +23,28 @@ logger = logging.getLogger(__name__)
 
 settings = Settings()
 
-# Get available fonts within fonts folder
-fonts = {}
 
-for path, dirs, files in os.walk(settings.FONT_PATH):
-    for _ in files:
-        if _.endswith(".otf"):
-            name = _.split(".otf")[0]
-            fonts[name] = os.path.join(path, _)
+def find_fonts(font_path: str = settings.FONT_PATH) -> dict:
+    """Finds all fonts (.otf and .ttf) within the given folder.
+
+    Returns:
+      A dictionary of fontname -> full path of the font file.
+    """
+    found = {}
+    for path, dirs, files in os.walk(font_path):
+        for _ in files:
+            if _.endswith(".otf"):
+                name = _.split(".otf")[0]
+                found[name] = os.path.join(path, _)
 
-        if _.endswith(".ttf"):
-            name = _.split(".ttf")[0]
-            fonts[name] = os.path.join(path, _)
+            if _.endswith(".ttf"):
+                name = _.split(".ttf")[0]
+                found[name] = os.path.join(path, _)
+    return found
+
+
+# Get available fonts within fonts folder
+fonts = find_fonts()
 logger.debug(f"Found fonts: {json.dumps(fonts, indent=4, sort_keys=True)}")
 available_fonts = [key for key, values in fonts.items()]
 
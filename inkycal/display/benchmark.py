@@ -0,0 +1,143 @@
+"""Driver benchmark
+Measures how long the E-Paper drivers take to pack a frame (getbuffer) and send it (display), and
+checks that the bytes they send are the same as in the reference frames. Runs without an E-Paper,
+on the recording mock backend of epdconfig, so busy-waits take no time.
+
+Use it from the command line with `python -m inkycal benchmark-drivers`.
+"""
+import hashlib
+import inspect
+import json
+import os
+import statistics
+import time
+from importlib import import_module
+
+from PIL import Image, ImageDraw
+
+from inkycal.display.drivers.epdconfig_mock import BACKEND_VARIABLE, MockBackend
+from inkycal.display.supported_models import supported_models
+
+REFERENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_frames.json")
+
+
+def driver_models() -> list:
+    """Returns the models with an SPI driver, i.e. the ones which can be benchmarked"""
+    return sorted(model for model in supported_models if model.startswith("epd"))
+
+
+def sample_frame(width: int, height: int, colour: bool = False) -> Image:
+    """Returns a black-white test image of the given size.
+
+    Shapes in the corners, lines and a checkerboard make sure rotated, mirrored or shifted
+    frames do not pass as the reference. The colour frame has different shapes.
+    """
+    image = Image.new("1", (width, height), 1)
+    draw = ImageDraw.Draw(image)
+    if colour:
+        draw.ellipse((width // 4, height // 4, width // 2, height // 2), fill=0)
+        draw.rectangle((width - 40, height - 30, width - 1, height - 1), fill=0)
+        draw.line((0, height - 1, width - 1, 0), fill=0, width=3)
+        return image
+
+    draw.rectangle((0, 0, 30, 20), fill=0)
+    draw.line((0, 0, width - 1, height - 1), fill=0, width=2)
+    draw.rectangle((width // 2, 10, width - 11, height // 3), outline=0, width=4)
+    for x in range(0, width // 3, 8):
+        for y in range(height // 2, height - 8, 8):
+            if (x + y) // 8 % 2:
+                draw.rectangle((x, y, x + 7, y + 7), fill=0)
+    return image
+
+
+def load_references() -> dict:
+    if not os.path.exists(REFERENCE_PATH):
+        return {}
+    with open(REFERENCE_PATH, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def benchmark_driver(model: str, repeat: int = 3) -> dict:
+    """Benchmarks the driver of one model.
+
+    Returns:
+        dict: median seconds of getbuffer and display, the bytes and SPI transfers sent by
+        display, the simulated busy time and a digest of the frame (all data bytes sent).
+    """
+    driver = import_module(f"inkycal.display.drivers.{model}")
+    mock = driver.epdconfig.implementation
+    if not isinstance(mock, MockBackend):
+        raise RuntimeError(f"The drivers use the {type(mock).__name__} backend, set {BACKEND_VARIABLE}=mock")
+    mock.time_scale = 0
+
+    epaper = driver.EPD()
+    epaper.init()
+    colour = len(inspect.signature(epaper.display).parameters) == 2
+    images = [sample_frame(epaper.width, epaper.height)]
+    if colour:
+        images.append(sample_frame(epaper.width, epaper.height, colour=True))
+
+    getbuffer_times, display_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        buffers = [epaper.getbuffer(image) for image in images]
+        getbuffer_times.append(time.perf_counter() - start)
+
+        mock.reset()
+        start = time.perf_counter()
+        epaper.display(*buffers)
+        display_times.append(time.perf_counter() - start)
+
+    data = mock.data()
+    return {
+        "getbuffer": statistics.median(getbuffer_times),
+        "display": statistics.median(display_times),
+        "bytes": len(data),
+        "spi_writes": mock.spi_writes,
+        "busy": mock.busy_time,
+        "frame": hashlib.blake2b(data, digest_size=16).hexdigest(),
+    }
+
+
+def benchmark_drivers(models: list or None = None, repeat: int = 3, update_references: bool = False) -> dict:
+    """Benchmarks the drivers of the given models, all SPI drivers if None.
+
+    The mock backend is selected unless the drivers were already imported with another one.
+    With update_references, the frames of these models become the new reference frames.
+
+    Returns:
+        dict: the results of benchmark_driver for each model, with "reference" set to
+        "ok", "mismatch" or "missing", and the list of mismatching models.
+    """
+    os.environ.setdefault(BACKEND_VARIABLE, "mock")
+    references = load_references()
+
+    results = {}
+    for model in models or driver_models():
+        result = results[model] = benchmark_driver(model, repeat)
+        if update_references:
+            references[model] = result["frame"]
+        if model not in references:
+            result["reference"] = "missing"
+        else:
+            result["reference"] = "ok" if references[model] == result["frame"] else "mismatch"
+
+    if update_references:
+        with open(REFERENCE_PATH, "w", encoding="utf-8") as file:
+            json.dump(dict(sorted(references.items())), file, indent=2)
+            file.write("\n")
+
+    return {
+        "models": results,
+        "mismatches": [model for model, result in results.items() if result["reference"] == "mismatch"],
+    }
+
+
+def print_report(report: dict) -> None:
+    """Prints the result of benchmark_drivers in a readable form"""
+    print(f"{'model':<24} {'getbuffer':>10} {'display':>10} {'bytes':>8} {'writes':>7} {'busy':>6}  reference")
+    for model, result in report["models"].items():
+        print(f"{model:<24} {result['getbuffer'] * 1000:8.1f}ms {result['display'] * 1000:8.1f}ms "
+              f"{result['bytes']:8d} {result['spi_writes']:7d} {result['busy']:5.1f}s  {result['reference']}")
+    if report["mismatches"]:
+        print(f"\nFrames differing from the reference: {', '.join(report['mismatches'])}")
@@ -2,13 +2,22 @@
 Inkycal ePaper driving functions
 Copyright by aceinnolab
 """
+import asyncio
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from importlib import import_module
 
+import numpy
 import PIL
 from PIL import Image
 
 from inkycal.display.supported_models import supported_models
 
+logger = logging.getLogger(__name__)
+
 
 def import_driver(model):
     return import_module(f'inkycal.display.drivers.{model}')
@@ -22,12 +31,34 @@ class Display:
 
     Args:
       - epaper_model: The name of your E-Paper model.
+      - partial_refresh: Only refresh the changed regions of the display if the
+        driver supports partial updates. Black-white displays only.
+      - full_refresh_interval: Number of partial refreshes after which a full
+        refresh is done to remove ghosting.
+      - metrics: Optional inkycal.utils.Metrics instance, records the time spent in
+        getbuffer, the SPI transfer and waiting for the busy pin.
+      - skip_unchanged: Do not refresh the display if the frame is the same as the
+        last one sent to the display, see frame_digest.
 
     """
 
-    def __init__(self, epaper_model):
+    # Maximum number of separate regions refreshed partially, more regions are merged into one
+    max_partial_regions = 4
+
+    # Changed rows closer than this (in pixels) are refreshed as one region
+    region_gap = 16
+
+    def __init__(self, epaper_model, partial_refresh: bool = False, full_refresh_interval: int = 10, metrics=None,
+                 skip_unchanged: bool = False):
         """Load the drivers for this epaper model"""
 
+        self.metrics = metrics
+        self.skip_unchanged = skip_unchanged
+
+        # Digest of the driver buffers of the last frame sent to the display. Can be restored
+        # after a restart, as the E-Paper keeps showing the last frame.
+        self.frame_digest = None
+
         if 'colour' in epaper_model:
             self.supports_colour = True
         else:
@@ -44,6 +75,27 @@ class Display:
         except FileNotFoundError:
             raise Exception('SPI could not be found. Please check if SPI is enabled')
 
+        # Partial refresh is only possible on black-white displays with a driver supporting it
+        self.partial_refresh = partial_refresh and not self.supports_colour and hasattr(self._epaper, "display_Partial")
+        if partial_refresh and not self.partial_refresh:
+            logger.info(f"{epaper_model} does not support partial refresh, using full refresh instead.")
+        self.full_refresh_interval = full_refresh_interval
+
+        # Last packed frame sent to the display and number of partial refreshes since the last full refresh.
+        # Deep sleep clears the RAM of the controller, which partial refreshes compare against, so the
+        # E-Paper is kept in standby between partial refreshes and only sent to sleep by sleep().
+        self._previous_frame = None
+        self._partial_updates = 0
+
+        # Measure the time the driver spends waiting for the busy pin, e.g. ReadBusy, M1_ReadBusy
+        self._busy_time = 0.0
+        for name in dir(self._epaper):
+            if name.endswith("ReadBusy") and callable(getattr(self._epaper, name)):
+                setattr(self._epaper, name, self._timed_busy(getattr(self._epaper, name)))
+
+        # Renders in the background for render_async, one frame at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inkycal_display")
+
     def test(self) -> None:
         """Test the display by showing a test image"""
         # TODO implement test image
@@ -87,25 +139,191 @@ class Display:
 
         epaper = self._epaper
 
+        if self.supports_colour and not im_colour:
+            raise Exception('im_colour is required for coloured epaper displays')
+
+        buffers = [self._getbuffer(im_black)]
+        if self.supports_colour:
+            buffers.append(self._getbuffer(im_colour))
+
+        digest = self._digest(*buffers)
+        if self.skip_unchanged and digest == self.frame_digest:
+            print('Frame unchanged, not refreshing the display')
+            return
+
         if self.supports_colour:
-            if not im_colour:
-                raise Exception('im_colour is required for coloured epaper displays')
             print('Initialising..', end='')
             epaper.init()
             print('Updating display......', end='')
-            epaper.display(epaper.getbuffer(im_black), epaper.getbuffer(im_colour))
+            self._push(epaper.display, *buffers)
             print('Done')
+        elif self.partial_refresh:
+            self._render_partial(buffers[0])
+            # the E-Paper stays in standby, keeping the frame in its RAM for the next partial refresh
+            self.frame_digest = digest
+            return
         else:
             print('Initialising..', end='')
             epaper.init()
             print('Updating display......', end='')
-            epaper.display(epaper.getbuffer(im_black))
+            self._push(epaper.display, buffers[0])
             print('Done')
+        self.frame_digest = digest
 
         print('Sending E-Paper to deep sleep...', end='')
         epaper.sleep()
         print('Done')
 
+    def sleep(self) -> None:
+        """Sends an E-Paper kept in standby for partial refreshes to deep sleep.
+
+        The next frame is then shown with a full refresh.
+        """
+        if self._previous_frame is None:
+            return
+        self._previous_frame = None
+        print('Sending E-Paper to deep sleep...', end='')
+        self._epaper.sleep()
+        print('Done')
+
+    async def render_async(self, im_black: PIL.Image, im_colour: PIL.Image or None = None) -> None:
+        """Renders an image like render, without blocking the event loop.
+
+        The display is updated in a background thread, so other work can be done
+        while the driver waits for the E-Paper to refresh:
+
+        >>> task = asyncio.create_task(display.render_async(sample_image))
+        >>> ...  # do something else
+        >>> await task
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.render, im_black, im_colour)
+
+    async def calibrate_async(self, cycles=3) -> None:
+        """Calibrates the display like calibrate, without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.calibrate, cycles)
+
+    def _render_partial(self, buffer) -> bool:
+        """Refreshes only the regions which changed since the last frame.
+
+        Falls back to a full refresh for the first frame and after every
+        full_refresh_interval partial refreshes.
+
+        Returns:
+            bool: False if nothing changed, the E-Paper was then not woken up at all.
+        """
+        epaper = self._epaper
+        frame = numpy.frombuffer(bytes(buffer), dtype=numpy.uint8)
+
+        regions = None
+        if self._previous_frame is not None and self._partial_updates < self.full_refresh_interval:
+            regions = self._changed_regions(self._previous_frame, frame, -(-epaper.width // 8))
+        if regions == []:
+            print('Nothing changed, not refreshing the display')
+            return False
+
+        print('Initialising..', end='')
+        if regions is None:
+            epaper.init()
+            print('Updating display......', end='')
+            # display_Base writes the frame to both RAMs, required for partial refreshes later on
+            if hasattr(epaper, "display_Base"):
+                self._push(epaper.display_Base, buffer)
+            else:
+                self._push(epaper.display, buffer)
+            self._partial_updates = 0
+        else:
+            # the E-Paper is in standby since the last refresh, its RAM still holds the previous frame
+            if hasattr(epaper, "init_Part"):
+                epaper.init_Part()
+            else:
+                epaper.init()
+            print(f'Updating {len(regions)} region(s) of display......', end='')
+            for region in regions:
+                self._push(epaper.display_Partial, buffer, *region)
+            self._partial_updates += 1
+        print('Done')
+
+        self._previous_frame = frame
+        return True
+
+    def _timer(self, stage: str):
+        """Times the given stage if metrics are enabled"""
+        return self.metrics.timer(stage) if self.metrics else nullcontext()
+
+    def _timed_busy(self, read_busy):
+        """Wraps a busy-wait function of the driver to record the time spent waiting"""
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return read_busy(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._busy_time += elapsed
+                if self.metrics:
+                    self.metrics.record("busy", elapsed)
+
+        return wrapper
+
+    def _getbuffer(self, image: PIL.Image):
+        """Converts an image to the driver's buffer format"""
+        with self._timer("getbuffer"):
+            return self._epaper.getbuffer(image)
+
+    @staticmethod
+    def _digest(*buffers) -> str:
+        """Returns a digest of the given driver buffers (bytes, lists of ints, numpy arrays or images)"""
+        digest = hashlib.blake2b(digest_size=16)
+        for buffer in buffers:
+            digest.update(buffer.tobytes() if hasattr(buffer, 'tobytes') else bytes(buffer))
+        return digest.hexdigest()
+
+    def _push(self, method, *args) -> None:
+        """Sends a frame to the display with the given driver method.
+
+        Records the time of the SPI transfer, i.e. the time spent in the method
+        without the time spent waiting for the busy pin.
+        """
+        busy_time = self._busy_time
+        start = time.perf_counter()
+        method(*args)
+        if self.metrics:
+            self.metrics.record("spi_transfer", time.perf_counter() - start - (self._busy_time - busy_time))
+
+    @classmethod
+    def _changed_regions(cls, previous: numpy.ndarray, current: numpy.ndarray, row_bytes: int) -> list:
+        """Finds the regions which changed between two packed frames.
+
+        Args:
+          - previous: The last packed frame (1 bit per pixel) as uint8 array.
+          - current: The new packed frame with the same layout.
+          - row_bytes: Number of bytes per row of the display.
+
+        Returns:
+          A list of regions (x_start, y_start, x_end, y_end) in display pixels, with
+          exclusive end coordinates, x aligned to whole bytes. An empty list if
+          nothing changed.
+        """
+        diff = numpy.bitwise_xor(previous, current).reshape(-1, row_bytes)
+        rows = numpy.flatnonzero(diff.any(axis=1))
+        if not rows.size:
+            return []
+
+        # Split the changed rows into runs, separated by larger unchanged gaps
+        breaks = numpy.flatnonzero(numpy.diff(rows) > cls.region_gap)
+        starts = rows[numpy.concatenate(([0], breaks + 1))]
+        ends = rows[numpy.concatenate((breaks, [rows.size - 1]))]
+        if len(starts) > cls.max_partial_regions:
+            starts, ends = starts[:1], ends[-1:]
+
+        regions = []
+        for start, end in zip(starts, ends):
+            columns = numpy.flatnonzero(diff[start:end + 1].any(axis=0))
+            regions.append((int(columns[0]) * 8, int(start), (int(columns[-1]) + 1) * 8, int(end) + 1))
+        return regions
+
     def calibrate(self, cycles=3):
         """Calibrates the display to retain crisp colours
 
@@ -128,6 +346,10 @@ class Display:
         epaper = self._epaper
         epaper.init()
 
+        # Calibration overwrites the display, the next frame needs a full refresh
+        self._previous_frame = None
+        self.frame_digest = None
+
         display_size = self.get_display_size(self.model_name)
 
         white = Image.new('1', display_size, 'white')
@@ -0,0 +1,25 @@
+"""Waiting for the busy pin of the E-Papers
+
+The drivers wait for the E-Paper with epdconfig.wait_busy, which sleeps until the busy pin
+changes (edge-triggered) instead of reading it in a loop, so a refresh of 5-30 seconds does not
+keep a core busy.
+"""
+
+# Longest time (seconds) a single busy-wait may take. Refreshes of coloured panels can take
+# well over half a minute in the cold, a panel still busy after this is not responding.
+BUSY_TIMEOUT = 180
+
+# Longest time (seconds) between two checks of the busy pin, in case an edge was missed
+CHECK_INTERVAL = 1.0
+
+
+class BusyTimeoutError(TimeoutError):
+    """The E-Paper did not release the busy pin in time"""
+
+    def __init__(self, pin: int, timeout: float):
+        super().__init__(
+            f"The E-Paper is still busy (BUSY pin {pin}) after {timeout}s. Check the connection to the "
+            f"display and that the model in the settings matches the display."
+        )
+        self.pin = pin
+        self.timeout = timeout
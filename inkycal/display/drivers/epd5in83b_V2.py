@@ -30,6 +30,7 @@ THE SOFTWARE.
 import logging
 
 from . import epdconfig
+from .packing import invert, pack_1bit
 
 # Display resolution
 EPD_WIDTH = 648
@@ -68,6 +69,13 @@ class EPD:
         epdconfig.spi_writebyte([data])
         epdconfig.digital_write(self.cs_pin, 1)
 
+    # send a whole buffer in as few SPI transfers as possible
+    def send_data_bulk(self, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebytes_bulk(data)
+        epdconfig.digital_write(self.cs_pin, 1)
+
     # send a lot of data   
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
@@ -78,9 +86,7 @@ class EPD:
     def ReadBusy(self):
         logger.debug("e-Paper busy")
         self.send_command(0X71)
-        while (epdconfig.digital_read(self.busy_pin) == 0):  # 0: idle, 1: busy
-            self.send_command(0X71)
-            epdconfig.delay_ms(200)
+        epdconfig.wait_busy(self.busy_pin, 0, poll=lambda: self.send_command(0X71), interval=0.2)  # 0: busy, 1: idle
         logger.debug("e-Paper busy release")
 
     def init(self):
@@ -121,40 +127,15 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if (imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif (imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return pack_1bit(image, self.width, self.height)
 
     def display(self, imageblack, imagered):
-        buf = [0x00] * int(self.width * self.height / 8)
-        for i in range(0, int(self.width * self.height / 8)):
-            buf[i] = ~imagered[i]
-
         if (imageblack != None):
             self.send_command(0X10)
-            self.send_data2(imageblack)
+            self.send_data_bulk(imageblack)
         if (imagered != None):
             self.send_command(0X13)
-            self.send_data2(buf)
+            self.send_data_bulk(invert(imagered))
 
         self.send_command(0x12)
         epdconfig.delay_ms(200)
@@ -162,9 +143,9 @@ class EPD:
 
     def Clear(self):
         self.send_command(0X10)
-        self.send_data2([0xFF] * int(self.width * self.height / 8))
+        self.send_data_bulk(b'\xFF' * int(self.width * self.height / 8))
         self.send_command(0X13)
-        self.send_data2([0x00] * int(self.width * self.height / 8))
+        self.send_data_bulk(bytes(int(self.width * self.height / 8)))
 
         self.send_command(0x12)
         epdconfig.delay_ms(200)
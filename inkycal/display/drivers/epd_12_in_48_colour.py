@@ -29,6 +29,7 @@ THE SOFTWARE.
 import time
 
 from inkycal.display.drivers import epdconfig_12_in_48 as epdconfig
+from inkycal.display.drivers.packing import invert, pack_1bit, quadrants
 
 EPD_WIDTH = 1304
 EPD_HEIGHT = 984
@@ -152,108 +153,48 @@ class EPD(object):
         self.SetLut()
 
     def getbuffer(self, image):
-        # logging.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-
-        if (imwidth == self.width and imheight == self.height):
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif (imwidth == self.height and imheight == self.width):
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return pack_1bit(image, self.width, self.height)
 
     def display(self, blackbuf, redbuf):
+        # quadrants of the controllers, M1 and S2 are 81 bytes (648 pixels) wide, S1 and M2 82
+        black_s2, black_m2, black_m1, black_s1 = quadrants(blackbuf, 163, 984, 81, 492)
+        red_s2, red_m2, red_m1, red_s1 = quadrants(invert(redbuf), 163, 984, 81, 492)
 
         # S2 part 648*492
         self.S2_SendCommand(0x10)
-        for y in range(0, 492):
-            for x in range(0, 81):
-                self.S2_SendData(blackbuf[y * 163 + x])
+        self.SendDataBulk(black_s2, self.EPD_S2_CS_PIN)
         self.S2_SendCommand(0x13)
-        for y in range(0, 492):
-            for x in range(0, 81):
-                self.S2_SendData(~redbuf[y * 163 + x])
+        self.SendDataBulk(red_s2, self.EPD_S2_CS_PIN)
 
         # M2 part 656*492
         self.M2_SendCommand(0x10)
-        for y in range(0, 492):
-            for x in range(81, 163):
-                self.M2_SendData(blackbuf[y * 163 + x])
+        self.SendDataBulk(black_m2, self.EPD_M2_CS_PIN)
         self.M2_SendCommand(0x13)
-        for y in range(0, 492):
-            for x in range(81, 163):
-                self.M2_SendData(~redbuf[y * 163 + x])
+        self.SendDataBulk(red_m2, self.EPD_M2_CS_PIN)
 
         # M1 part 648*492
         self.M1_SendCommand(0x10)
-        for y in range(492, 984):
-            for x in range(0, 81):
-                self.M1_SendData(blackbuf[y * 163 + x])
+        self.SendDataBulk(black_m1, self.EPD_M1_CS_PIN)
         self.M1_SendCommand(0x13)
-        for y in range(492, 984):
-            for x in range(0, 81):
-                self.M1_SendData(~redbuf[y * 163 + x])
+        self.SendDataBulk(red_m1, self.EPD_M1_CS_PIN)
 
         # S1 part 656*492
         self.S1_SendCommand(0x10)
-        for y in range(492, 984):
-            for x in range(81, 163):
-                self.S1_SendData(blackbuf[y * 163 + x])
+        self.SendDataBulk(black_s1, self.EPD_S1_CS_PIN)
         self.S1_SendCommand(0x13)
-        for y in range(492, 984):
-            for x in range(81, 163):
-                self.S1_SendData(~redbuf[y * 163 + x])
+        self.SendDataBulk(red_s1, self.EPD_S1_CS_PIN)
         self.TurnOnDisplay()
 
     def clear(self):
         """Clear contents of image buffer"""
-
-        self.S2_SendCommand(0x10)
-        for y in range(0, 492):
-            for x in range(0, 81):
-                self.S2_SendData(0xff)
-        self.S2_SendCommand(0x13)
-        for y in range(0, 492):
-            for x in range(0, 81):
-                self.S2_SendData(0x00)
-
-        self.M2_SendCommand(0x10)
-        for y in range(0, 492):
-            for x in range(81, 163):
-                self.M2_SendData(0xff)
-        self.M2_SendCommand(0x13)
-        for y in range(0, 492):
-            for x in range(81, 163):
-                self.M2_SendData(0x00)
-
-        self.M1_SendCommand(0x10)
-        for y in range(492, 984):
-            for x in range(0, 81):
-                self.M1_SendData(0xff)
-        self.M1_SendCommand(0x13)
-        for y in range(492, 984):
-            for x in range(0, 81):
-                self.M1_SendData(0x00)
-
-        self.S1_SendCommand(0x10)
-        for y in range(492, 984):
-            for x in range(81, 163):
-                self.S1_SendData(0xff)
-        self.S1_SendCommand(0x13)
-        for y in range(492, 984):
-            for x in range(81, 163):
-                self.S1_SendData(0x00)
+        # every controller gets the same bytes, so they are sent to all of them at once
+        all_cs_pins = (self.EPD_M1_CS_PIN, self.EPD_S1_CS_PIN, self.EPD_M2_CS_PIN, self.EPD_S2_CS_PIN)
+        self.M1S1M2S2_SendCommand(0x10)
+        self.SendDataBulk(bytes([0xff]) * (492 * 81), *all_cs_pins)
+        self.SendDataBulk(bytes([0xff]) * 492, self.EPD_S1_CS_PIN, self.EPD_M2_CS_PIN)
+        self.M1S1M2S2_SendCommand(0x13)
+        self.SendDataBulk(bytes(492 * 81), *all_cs_pins)
+        self.SendDataBulk(bytes(492), self.EPD_S1_CS_PIN, self.EPD_M2_CS_PIN)
 
         self.TurnOnDisplay()
 
@@ -287,6 +228,17 @@ class EPD(object):
         self.M2_ReadBusy()
         self.S2_ReadBusy()
 
+    """   Write a whole buffer to one or more controllers     """
+
+    def SendDataBulk(self, data, *cs_pins):
+        epdconfig.digital_write(self.EPD_M1S1_DC_PIN, 1)
+        epdconfig.digital_write(self.EPD_M2S2_DC_PIN, 1)
+        for cs_pin in cs_pins:
+            epdconfig.digital_write(cs_pin, 0)
+        epdconfig.spi_writebytes_bulk(data)
+        for cs_pin in cs_pins:
+            epdconfig.digital_write(cs_pin, 1)
+
     """   M1S1M2S2 Write register address and data     """
 
     def M1S1M2S2_SendCommand(self, cmd):
@@ -396,43 +348,22 @@ class EPD(object):
     # Busy
     def M1_ReadBusy(self):
         self.M1_SendCommand(0x71)
-        busy = epdconfig.digital_read(self.EPD_M1_BUSY_PIN)
-        busy = not (busy & 0x01)
-        while (busy):
-            self.M1_SendCommand(0x71)
-            busy = epdconfig.digital_read(self.EPD_M1_BUSY_PIN)
-            busy = not (busy & 0x01)
+        epdconfig.wait_busy(self.EPD_M1_BUSY_PIN, 0, poll=lambda: self.M1_SendCommand(0x71), interval=0.1)
         time.sleep(0.2)
 
     def M2_ReadBusy(self):
         self.M2_SendCommand(0x71)
-        busy = epdconfig.digital_read(self.EPD_M2_BUSY_PIN)
-        busy = not (busy & 0x01)
-        self.M2_SendCommand(0x71)
-        while (busy):
-            self.M2_SendCommand(0x71)
-            busy = epdconfig.digital_read(self.EPD_M2_BUSY_PIN)
-            busy = not (busy & 0x01)
+        epdconfig.wait_busy(self.EPD_M2_BUSY_PIN, 0, poll=lambda: self.M2_SendCommand(0x71), interval=0.1)
         time.sleep(0.2)
 
     def S1_ReadBusy(self):
         self.S1_SendCommand(0x71)
-        busy = epdconfig.digital_read(self.EPD_S1_BUSY_PIN)
-        busy = not (busy & 0x01)
-        while (busy):
-            self.S1_SendCommand(0x71)
-            busy = epdconfig.digital_read(self.EPD_S1_BUSY_PIN)
-            busy = not (busy & 0x01)
+        epdconfig.wait_busy(self.EPD_S1_BUSY_PIN, 0, poll=lambda: self.S1_SendCommand(0x71), interval=0.1)
         time.sleep(0.2)
 
     def S2_ReadBusy(self):
         self.S2_SendCommand(0x71)
-        busy = epdconfig.digital_read(self.EPD_S2_BUSY_PIN)
-        busy = not (busy & 0x01)
-        while (busy):
-            self.S2_SendCommand(0x71)
-            busy = epdconfig.digital_read(self.EPD_S2_BUSY_PIN)
-            busy = not (busy & 0x01)
+        epdconfig.wait_busy(self.EPD_S2_BUSY_PIN, 0, poll=lambda: self.S2_SendCommand(0x71), interval=0.1)
         time.sleep(0.2)
 
     lut_vcom1 = [
@@ -30,6 +30,7 @@ THE SOFTWARE.
 import logging
 
 from inkycal.display.drivers import epdconfig
+from inkycal.display.drivers.packing import invert, pack_1bit, pack_4gray, split_4gray, window
 
 # Display resolution
 EPD_WIDTH = 960
@@ -120,6 +121,13 @@ class EPD:
         epdconfig.spi_writebyte([data])
         epdconfig.digital_write(self.cs_pin, 1)
 
+    # send a whole buffer in as few SPI transfers as possible
+    def send_data_bulk(self, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebytes_bulk(data)
+        epdconfig.digital_write(self.cs_pin, 1)
+
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
         epdconfig.digital_write(self.cs_pin, 0)
@@ -128,10 +136,7 @@ class EPD:
 
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        busy = epdconfig.digital_read(self.busy_pin)
-        while (busy == 1):
-            busy = epdconfig.digital_read(self.busy_pin)
-            epdconfig.delay_ms(20)
+        epdconfig.wait_busy(self.busy_pin, 1)
         epdconfig.delay_ms(20)
         logger.debug("e-Paper busy release")
 
@@ -304,88 +309,30 @@ class EPD:
         self.ReadBusy()
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if imwidth == self.width and imheight == self.height:
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif imwidth == self.height and imheight == self.width:
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return pack_1bit(image, self.width, self.height)
 
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i = 0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if (imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if (pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i = i + 1
-                    if (i % 4 == 0):
-                        buf[int((x + (y * self.width)) / 4)] = (
-                                (pixels[x - 3, y] & 0xc0) | (pixels[x - 2, y] & 0xc0) >> 2 | (
-                                pixels[x - 1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
-
-        elif (imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if (pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i = i + 1
-                    if (i % 4 == 0):
-                        buf[int((newx + (newy * self.width)) / 4)] = (
-                                (pixels[x, y - 3] & 0xc0) | (pixels[x, y - 2] & 0xc0) >> 2 | (
-                                pixels[x, y - 1] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
-        return buf
+        return pack_4gray(image, self.width, self.height)
 
     def Clear(self):
-        buf = [0xFF] * (int(self.width / 8) * self.height)
+        buf = b'\xFF' * (int(self.width / 8) * self.height)
         self.send_command(0x24)
-        self.send_data2(buf)
+        self.send_data_bulk(buf)
 
         self.TurnOnDisplay()
 
     def display(self, image):
         self.send_command(0x24)
-        self.send_data2(image)
+        self.send_data_bulk(image)
 
         self.TurnOnDisplay()
 
     def display_Base(self, image):
         self.send_command(0x24)
-        self.send_data2(image)
+        self.send_data_bulk(image)
 
         self.send_command(0x26)
-        self.send_data2(image)
+        self.send_data_bulk(image)
 
         self.TurnOnDisplay()
 
@@ -396,14 +343,10 @@ class EPD:
             Width = self.width // 8 + 1
         Height = self.height
         self.send_command(0x24)  # Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_data_bulk(bytes([color]) * (Width * Height))
 
         self.send_command(0x26)  # Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_data_bulk(bytes([color]) * (Width * Height))
         # self.TurnOnDisplay()
 
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
@@ -446,76 +389,16 @@ class EPD:
         self.send_data((Ystart >> 8) & 0x01)
 
         self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                if ((j > Ystart - 1) & (j < (Yend + 1)) & (i > Xstart - 1) & (i < (Xend + 1))):
-                    self.send_data(Image[i + j * Width])
+        self.send_data_bulk(window(Image, Width, Height, Xstart, Ystart, Xend, Yend))
         self.TurnOnDisplay_Part()
 
     def display_4Gray(self, image):
+        high, low = split_4gray(image[:163200])
         self.send_command(0x24)
-        for i in range(0, 81600):
-            temp3 = 0
-            for j in range(0, 2):
-                temp1 = image[i * 2 + j]
-                for k in range(0, 2):
-                    temp2 = temp1 & 0xC0
-                    if (temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif (temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif (temp2 == 0x80):
-                        temp3 |= 0x01
-                    else:  # 0x40
-                        temp3 |= 0x00
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1 & 0xC0
-                    if (temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif (temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif (temp2 == 0x80):
-                        temp3 |= 0x01
-                    else:  # 0x40
-                        temp3 |= 0x00
-                    if (j != 1 or k != 1):
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
+        self.send_data_bulk(invert(low))  # black and gray1
 
         self.send_command(0x26)
-        for i in range(0, 81600):
-            temp3 = 0
-            for j in range(0, 2):
-                temp1 = image[i * 2 + j]
-                for k in range(0, 2):
-                    temp2 = temp1 & 0xC0
-                    if (temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif (temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif (temp2 == 0x80):
-                        temp3 |= 0x00
-                    else:  # 0x40
-                        temp3 |= 0x01
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1 & 0xC0
-                    if (temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif (temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif (temp2 == 0x80):
-                        temp3 |= 0x00
-                    else:  # 0x40
-                        temp3 |= 0x01
-                    if (j != 1 or k != 1):
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
+        self.send_data_bulk(invert(high))  # black and gray2
 
         self.TurnOnDisplay_4GRAY()
 
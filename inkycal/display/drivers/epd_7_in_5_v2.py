@@ -30,6 +30,7 @@ THE SOFTWARE.
 import logging
 
 from inkycal.display.drivers import epdconfig
+from inkycal.display.drivers.packing import pack_1bit
 
 # Display resolution
 EPD_WIDTH = 800
@@ -68,6 +69,13 @@ class EPD:
         epdconfig.spi_writebyte([data])
         epdconfig.digital_write(self.cs_pin, 1)
 
+    # send a whole buffer in as few SPI transfers as possible
+    def send_data_bulk(self, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebytes_bulk(data)
+        epdconfig.digital_write(self.cs_pin, 1)
+
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
         epdconfig.digital_write(self.cs_pin, 0)
@@ -77,10 +85,7 @@ class EPD:
     def ReadBusy(self):
         logger.debug("e-Paper busy")
         self.send_command(0x71)
-        busy = epdconfig.digital_read(self.busy_pin)
-        while (busy == 0):
-            self.send_command(0x71)
-            busy = epdconfig.digital_read(self.busy_pin)
+        epdconfig.wait_busy(self.busy_pin, 0, poll=lambda: self.send_command(0x71), interval=0.1)
         epdconfig.delay_ms(20)
         logger.debug("e-Paper busy release")
 
@@ -129,39 +134,33 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        img = image
-        imwidth, imheight = img.size
-        if (imwidth == self.width and imheight == self.height):
-            img = img.convert('1')
-        elif (imwidth == self.height and imheight == self.width):
+        imwidth, imheight = image.size
+        if imwidth == self.height and imheight == self.width:
             # image has correct dimensions, but needs to be rotated
-            img = img.rotate(90, expand=True).convert('1')
-        else:
+            image = image.rotate(90, expand=True)
+        elif imwidth != self.width or imheight != self.height:
             logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
             # return a blank buffer
-            return [0x00] * (int(self.width / 8) * self.height)
+            return bytearray(int(self.width / 8) * self.height)
 
-        buf = bytearray(img.tobytes('raw'))
-        # The bytes need to be inverted, because in the PIL world 0=black and 1=white, but
+        # The bytes are inverted, because in the PIL world 0=black and 1=white, but
         # in the e-paper world 0=white and 1=black.
-        for i in range(len(buf)):
-            buf[i] ^= 0xFF
-        return buf
+        return pack_1bit(image, self.width, self.height, invert=True)
 
     def display(self, image):
         self.send_command(0x13)
-        self.send_data2(image)
+        self.send_data_bulk(image)
 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
     def Clear(self):
-        buf = [0x00] * (int(self.width / 8) * self.height)
+        buf = bytes(int(self.width / 8) * self.height)
         self.send_command(0x10)
-        self.send_data2(buf)
+        self.send_data_bulk(buf)
         self.send_command(0x13)
-        self.send_data2(buf)
+        self.send_data_bulk(buf)
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
@@ -31,8 +31,24 @@ import logging
 import sys
 import time
 
+from inkycal.display.drivers.busy import BUSY_TIMEOUT, CHECK_INTERVAL, BusyTimeoutError
+from inkycal.display.drivers.epdconfig_mock import MockBackend, backend
+
 logger = logging.getLogger(__name__)
 
+# Size limit of one transfer of the spidev kernel driver, see /sys/module/spidev/parameters/bufsiz
+SPIDEV_BUFSIZ = "/sys/module/spidev/parameters/bufsiz"
+DEFAULT_BUFSIZ = 4096
+
+
+def spi_bufsiz() -> int:
+    """Returns the largest number of bytes the spidev driver accepts in one transfer"""
+    try:
+        with open(SPIDEV_BUFSIZ) as file:
+            return int(file.read())
+    except (OSError, ValueError):
+        return DEFAULT_BUFSIZ
+
 
 class RaspberryPi:
     # Pin definition
@@ -52,6 +68,7 @@ class RaspberryPi:
         # self.GPIO_CS_PIN     = gpiozero.LED(self.CS_PIN)
         self.GPIO_PWR_PIN = gpiozero.LED(self.PWR_PIN)
         self.GPIO_BUSY_PIN = gpiozero.Button(self.BUSY_PIN, pull_up=False)
+        self.bufsiz = spi_bufsiz()
 
     def digital_write(self, pin, value):
         if pin == self.RST_PIN:
@@ -90,12 +107,51 @@ class RaspberryPi:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, pin, busy_level, timeout=BUSY_TIMEOUT, poll=None, interval=CHECK_INTERVAL):
+        """Sleeps until the busy pin leaves busy_level, woken by the edge of the pin.
+
+        Args:
+            pin: The busy pin.
+            busy_level: Level of the pin while the E-Paper is busy, 0 or 1.
+            timeout: Seconds after which BusyTimeoutError is raised.
+            poll: Optional function called every interval seconds while busy, for controllers
+                which only update the pin after a status command.
+            interval: Seconds between calls of poll.
+
+        Returns:
+            float: The seconds waited.
+        """
+        # the button is pressed (active) when the pin is high
+        wait = self.GPIO_BUSY_PIN.wait_for_press if busy_level == 0 else self.GPIO_BUSY_PIN.wait_for_release
+        start = time.monotonic()
+        while True:
+            waited = time.monotonic() - start
+            if waited >= timeout:
+                raise BusyTimeoutError(pin, timeout)
+            if wait(min(timeout - waited, interval if poll else timeout)):
+                waited = time.monotonic() - start
+                logger.debug(f"e-Paper busy for {waited:.2f}s")
+                return waited
+            if poll:
+                poll()
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
         self.SPI.writebytes2(data)
 
+    def spi_writebytes_bulk(self, data):
+        """Writes a whole buffer (bytes, bytearray or list of bytes) in transfers of bufsiz bytes.
+
+        A single transfer per bufsiz chunk instead of one per byte, without copying the chunks.
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(value & 0xFF for value in data)
+        view = memoryview(data).cast("B")
+        for start in range(0, len(view), self.bufsiz):
+            self.SPI.writebytes2(view[start:start + self.bufsiz])
+
     def module_init(self):
         self.GPIO_PWR_PIN.on()
 
@@ -122,7 +178,12 @@ class RaspberryPi:
             self.GPIO_BUSY_PIN.close()
 
 
-implementation = RaspberryPi()
+if backend() == "mock":
+    implementation = MockBackend(((RaspberryPi.CS_PIN, RaspberryPi.DC_PIN),), (RaspberryPi.BUSY_PIN,))
+    for pin in [x for x in dir(RaspberryPi) if x.endswith("_PIN")]:
+        setattr(implementation, pin, getattr(RaspberryPi, pin))
+else:
+    implementation = RaspberryPi()
 
 for func in [x for x in dir(implementation) if not x.startswith('_')]:
     setattr(sys.modules[__name__], func, getattr(implementation, func))
@@ -28,10 +28,15 @@ THE SOFTWARE.
 """
 import logging
 import os
+import sys
 import time
 from ctypes import *
 
-import RPi.GPIO as GPIO
+from inkycal.display.drivers.busy import BUSY_TIMEOUT, CHECK_INTERVAL, BusyTimeoutError
+from inkycal.display.drivers.epdconfig_mock import MockBackend, backend
+
+if backend() != "mock":
+    import RPi.GPIO as GPIO
 
 EPD_SCK_PIN = 11
 EPD_MOSI_PIN = 10
@@ -58,7 +63,7 @@ find_dirs = [
     '/usr/lib',
 ]
 spi = None
-for find_dir in find_dirs:
+for find_dir in find_dirs if backend() != "mock" else []:
     val = int(os.popen('getconf LONG_BIT').read())
     logging.debug("System is %d bit" % val)
     if val == 64:
@@ -71,6 +76,9 @@ for find_dir in find_dirs:
 if spi is None:
     RuntimeError('Cannot find DEV_Config.so')
 
+# Libraries built from newer versions of DEV_Config.c can write a whole buffer in one call
+write_bytes = getattr(spi, 'DEV_SPI_Write_nByte', None) if spi is not None else None
+
 
 def digital_write(pin, value):
     GPIO.output(pin, value)
@@ -80,10 +88,47 @@ def digital_read(pin):
     return GPIO.input(pin)
 
 
+def wait_busy(pin, busy_level, timeout=BUSY_TIMEOUT, poll=None, interval=CHECK_INTERVAL):
+    """Sleeps until the busy pin leaves busy_level, woken by the edge of the pin.
+
+    Calls poll (if given) every interval seconds while busy and raises BusyTimeoutError after
+    timeout seconds. Returns the seconds waited.
+    """
+    edge = GPIO.RISING if busy_level == 0 else GPIO.FALLING
+    start = time.monotonic()
+    while GPIO.input(pin) == busy_level:
+        waited = time.monotonic() - start
+        if waited >= timeout:
+            raise BusyTimeoutError(pin, timeout)
+        # the edge can come before waiting for it, so check the level again now and then
+        GPIO.wait_for_edge(pin, edge, timeout=max(1, int(min(timeout - waited, interval) * 1000)))
+        if poll and GPIO.input(pin) == busy_level:
+            poll()
+    waited = time.monotonic() - start
+    logging.debug("e-Paper busy for %.2fs" % waited)
+    return waited
+
+
 def spi_writebyte(value):
     spi.DEV_SPI_WriteByte(value)
 
 
+def spi_writebytes_bulk(data):
+    """Writes a whole buffer (bytes or list of bytes) to the selected controllers.
+
+    Passes the buffer to the library in a single call if it has DEV_SPI_Write_nByte, else writes
+    it byte by byte from a tight loop, without toggling DC and chip-select around every byte.
+    """
+    if not isinstance(data, bytearray):
+        data = bytearray(value & 0xFF for value in data) if isinstance(data, list) else bytearray(data)
+    if write_bytes is not None:
+        write_bytes((c_ubyte * len(data)).from_buffer(data), c_uint32(len(data)))
+        return
+    write_byte = spi.DEV_SPI_WriteByte
+    for value in data:
+        write_byte(value)
+
+
 def delay_ms(delaytime):
     time.sleep(delaytime / 1000.0)
 
@@ -155,3 +200,14 @@ def spi_readbyte(Reg):
 
 def delay_ms(delaytime):
     time.sleep(delaytime / 1000.0)
+
+
+if backend() == "mock":
+    implementation = MockBackend(
+        ((EPD_M1_CS_PIN, EPD_M1S1_DC_PIN), (EPD_S1_CS_PIN, EPD_M1S1_DC_PIN),
+         (EPD_M2_CS_PIN, EPD_M2S2_DC_PIN), (EPD_S2_CS_PIN, EPD_M2S2_DC_PIN)),
+        (EPD_M1_BUSY_PIN, EPD_S1_BUSY_PIN, EPD_M2_BUSY_PIN, EPD_S2_BUSY_PIN),
+    )
+    for func in ["digital_write", "digital_read", "wait_busy", "spi_writebyte", "spi_writebytes_bulk",
+                 "spi_readbyte", "delay_ms", "module_init", "module_exit"]:
+        setattr(sys.modules[__name__], func, getattr(implementation, func))
@@ -0,0 +1,238 @@
+"""
+Recording mock of the epdconfig hardware interface
+
+Lets the drivers run without an E-Paper, spidev or gpiozero, e.g. on a plain Linux box.
+Select it with the environment variable INKYCAL_EPD_BACKEND=mock or with
+"epd_backend": "mock" in the settings file.
+
+Instead of talking to the hardware, everything the driver does is recorded in memory:
+  - transfers: the bytes sent over SPI, as [dc, selected chip-select pins, bytes], consecutive
+    writes with the same DC level and chip-selects merged into one entry
+  - events: GPIO writes (except the DC and CS toggles, which are only counted in gpio_writes),
+    busy-waits and delays, each with the simulated time
+  - spi_writes: the number of SPI transfers, as the kernel would see them
+
+After a command which keeps the panel busy (e.g. the display refresh), the busy pin reads busy
+for a simulated time which depends on the panel model, see PANELS. The time is simulated, so
+the driver does not actually wait, unless INKYCAL_EPD_TIME_SCALE is set (1 = real time).
+"""
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+from inkycal.display.drivers.busy import BUSY_TIMEOUT, CHECK_INTERVAL, BusyTimeoutError
+
+logger = logging.getLogger(__name__)
+
+BACKEND_VARIABLE = "INKYCAL_EPD_BACKEND"
+TIME_SCALE_VARIABLE = "INKYCAL_EPD_TIME_SCALE"
+
+# Busy level of the controllers and how long (seconds) commands keep them busy, None stands for
+# the refresh time of the panel. The SSD16xx controllers only refresh the display with 0x20 if the
+# update option set with 0x22 includes it (0x04), and do a fast partial refresh in display mode 2 (0x08).
+UC81XX = {"busy_level": 0, "commands": {0x02: 0.05, 0x04: 0.1, 0x12: None}}
+SSD16XX = {"busy_level": 1, "commands": {0x12: 0.01, 0x20: None}, "update_control": 0x22}
+PARTIAL_REFRESH = 0.6
+LOAD_ONLY = 0.1
+
+# Controller and approximate time (seconds) of a full refresh of each panel
+PANELS = {
+    "epd_4_in_2": (UC81XX, 4.0),
+    "epd_4_in_2_colour": (UC81XX, 15.0),
+    "epd_5_in_83": (UC81XX, 6.0),
+    "epd_5_in_83_V2": (UC81XX, 5.0),
+    "epd_5_in_83_colour": (UC81XX, 16.0),
+    "epd5in83b_V2": (UC81XX, 16.0),
+    "epd_7_in_5": (UC81XX, 6.0),
+    "epd_7_in_5_colour": (UC81XX, 31.0),
+    "epd_7_in_5_v2": (UC81XX, 5.0),
+    "epd_7_in_5_v2_colour": (UC81XX, 16.0),
+    "epd_7_in_5_v3": (SSD16XX, 5.0),
+    "epd_7_in_5_v3_colour": (SSD16XX, 22.0),
+    "epd_12_in_48": (UC81XX, 12.0),
+    "epd_12_in_48_colour": (UC81XX, 16.0),
+    "epd_12_in_48_colour_V2": (UC81XX, 16.0),
+    "epd_13_in_3": (SSD16XX, 3.5),
+    "epd_13_in_3_colour": (SSD16XX, 20.0),
+}
+DEFAULT_PANEL = (UC81XX, 5.0)
+
+
+def backend() -> str:
+    """Returns the name of the selected epdconfig backend, 'spidev' unless configured otherwise"""
+    return os.environ.get(BACKEND_VARIABLE, "spidev")
+
+
+class _SPI:
+    """Stands in for spidev.SpiDev, for drivers writing to epdconfig.SPI directly"""
+
+    def __init__(self, mock):
+        self._mock = mock
+
+    def writebytes(self, data):
+        self._mock.spi_writebyte(data)
+
+    def writebytes2(self, data):
+        self._mock.spi_writebyte2(data)
+
+
+class MockBackend:
+    """Records what a driver sends to the E-Paper instead of sending it.
+
+    Args:
+        controllers (tuple): The (chip-select pin, DC pin) of each controller of the panel. Chip-selects
+            select when low, DC switches between command (low) and data (high).
+        busy_pins (tuple): Pins the driver reads to wait for the panel.
+        model (str): The panel model simulated. If None, the model of the driver which called
+            module_init last, e.g. epd_7_in_5_v2.
+        time_scale (float): Factor of the simulated times the driver really waits, 0 to not wait at all.
+    """
+
+    bufsiz = 4096
+
+    def __init__(self, controllers: tuple, busy_pins: tuple, model: str or None = None,
+                 time_scale: float or None = None):
+        self.controllers = controllers
+        self.cs_pins = tuple(cs for cs, dc in controllers)
+        self.dc_pins = tuple(dc for cs, dc in controllers)
+        self._dc_of = dict(controllers)
+        self.busy_pins = busy_pins
+        self.model = model
+        self._detect_model = model is None
+        # simulates a panel which never releases the busy pin
+        self.stuck = False
+        if time_scale is None:
+            time_scale = float(os.environ.get(TIME_SCALE_VARIABLE, 0))
+        self.time_scale = time_scale
+        self.SPI = _SPI(self)
+        self._levels = {}
+        # simulated time in seconds and until when the panel is busy
+        self.clock = 0.0
+        self._busy_until = 0.0
+        self._command = None
+        self._update_option = 0xFF
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the recordings, the simulated time keeps running"""
+        self.transfers = []
+        self.events = []
+        self.gpio_writes = Counter()
+        self.spi_writes = 0
+        self.busy_time = 0.0
+
+    @property
+    def panel(self) -> tuple:
+        """The controller and refresh time of the simulated panel, see PANELS"""
+        return PANELS.get(self.model, DEFAULT_PANEL)
+
+    def data(self) -> bytes:
+        """Returns all bytes sent as data (DC high), e.g. to compare frames"""
+        return b"".join(bytes(data) for dc, cs, data in self.transfers if dc)
+
+    def _wait(self, seconds: float) -> None:
+        self.clock += seconds
+        if self.time_scale:
+            time.sleep(seconds * self.time_scale)
+
+    def _write(self, data) -> None:
+        if isinstance(data, int):
+            data = [data]
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(value & 0xFF for value in data)
+        data = bytes(data)
+        self.spi_writes += 1
+
+        cs = tuple(pin for pin in self.cs_pins if not self._levels.get(pin, 1))
+        # the DC pin of the first selected controller, spidev selects the first one itself
+        dc = self._levels.get(self._dc_of[cs[0]] if cs else self.dc_pins[0], 0)
+        if self.transfers and self.transfers[-1][:2] == [dc, cs]:
+            self.transfers[-1][2].extend(data)
+        else:
+            self.transfers.append([dc, cs, bytearray(data)])
+
+        controller, refresh = self.panel
+        if dc:
+            if data and self._command is not None and self._command == controller.get("update_control"):
+                self._update_option = data[0]
+            self._command = None
+            return
+
+        for command in data:
+            self._command = command
+            if command in controller["commands"]:
+                seconds = controller["commands"][command]
+                if seconds is None and "update_control" in controller:
+                    if not self._update_option & 0x04:
+                        seconds = LOAD_ONLY
+                    elif self._update_option & 0x08:
+                        seconds = PARTIAL_REFRESH
+                self._busy_until = max(self._busy_until, self.clock + (refresh if seconds is None else seconds))
+
+    def digital_write(self, pin, value):
+        value = int(bool(value))
+        self._levels[pin] = value
+        self.gpio_writes[pin] += 1
+        if pin not in self.dc_pins and pin not in self.cs_pins:
+            self.events.append((self.clock, "gpio", (pin, value)))
+
+    def digital_read(self, pin):
+        if pin in self.busy_pins:
+            busy_level = self.panel[0]["busy_level"]
+            if self.clock < self._busy_until:
+                # the panel stays busy until the simulated refresh is done
+                seconds = self._busy_until - self.clock
+                self.events.append((self.clock, "busy", seconds))
+                self.busy_time += seconds
+                self._wait(seconds)
+                return busy_level
+            return 1 - busy_level
+        return self._levels.get(pin, 0)
+
+    def wait_busy(self, pin, busy_level, timeout=BUSY_TIMEOUT, poll=None, interval=CHECK_INTERVAL):
+        seconds = self._busy_until - self.clock
+        if self.stuck or seconds > timeout:
+            self._wait(timeout)
+            raise BusyTimeoutError(pin, timeout)
+        if seconds <= 0:
+            return 0.0
+        if busy_level != self.panel[0]["busy_level"]:
+            logger.warning(f"{self.model} waits for busy level {busy_level}, the simulated panel is busy at "
+                           f"{self.panel[0]['busy_level']}")
+        self.events.append((self.clock, "busy", seconds))
+        self.busy_time += seconds
+        self._wait(seconds)
+        return seconds
+
+    def delay_ms(self, delaytime):
+        self.events.append((self.clock, "delay", delaytime))
+        self._wait(delaytime / 1000.0)
+
+    def spi_writebyte(self, data):
+        self._write(data)
+
+    def spi_writebyte2(self, data):
+        self._write(data)
+
+    def spi_writebytes_bulk(self, data):
+        view = memoryview(data if isinstance(data, (bytes, bytearray)) else bytes(value & 0xFF for value in data))
+        for start in range(0, len(view), self.bufsiz):
+            self._write(view[start:start + self.bufsiz])
+
+    def spi_readbyte(self, reg):
+        return 0
+
+    def module_init(self, *args, **kwargs):
+        if self._detect_model:
+            # the driver calling module_init tells which panel is simulated
+            caller = sys._getframe(1).f_globals.get("__name__", "")
+            self.model = caller.rsplit(".", 1)[-1]
+            if self.model not in PANELS:
+                logger.warning(f"No busy timings for {self.model}, using those of a {DEFAULT_PANEL[1]}s refresh")
+        self.events.append((self.clock, "init", self.model))
+        return 0
+
+    def module_exit(self, *args, **kwargs):
+        self.events.append((self.clock, "exit", None))
@@ -0,0 +1,153 @@
+"""Packing of images into the frame buffers of the Waveshare SPI drivers
+
+Builds the byte layouts the drivers used to create with nested python loops over pixels[x, y]
+with numpy instead, bit for bit:
+  - pack_1bit: 1 bit per pixel, most significant bit first, 1 = white
+  - pack_2bit: 2 bits per pixel, black = 00 and white = 11, used by the older 3-colour panels
+  - pack_4gray: 2 bits per pixel with 4 grey levels
+
+and the conversions of these buffers some panels need before sending them, so the drivers can
+send whole buffers at once instead of one byte at a time.
+
+Images of the size of the panel are packed as they are. Images with width and height swapped
+(landscape) are rotated: pixel (x, y) of the image is pixel (y, height - x - 1) of the panel.
+Pixels are numbered row by row across the whole panel, like the drivers did.
+"""
+import numpy
+from PIL import Image
+
+
+def _orient(pixels: numpy.ndarray, width: int, height: int, flip: bool = True) -> numpy.ndarray or None:
+    """Returns the pixels (rows, columns) in the orientation of the panel, None if the size does not match.
+
+    With flip=False, landscape images are transposed instead of rotated (pixel (x, y) becomes (y, x)).
+    """
+    if pixels.shape == (height, width):
+        return pixels
+    if pixels.shape == (width, height):
+        return numpy.rot90(pixels) if flip else pixels.T
+    return None
+
+
+def _pack(values: numpy.ndarray, bits: int, length: int, fill: int, partial: bool = True) -> bytearray:
+    """Packs the values (bits wide, most significant first) of the pixels into a buffer of length bytes.
+
+    Bytes after the last pixel keep the fill byte. A byte only partly covered by pixels keeps the
+    bits of the fill byte which are not covered, or is not written at all with partial=False.
+    """
+    per_byte = 8 // bits
+    shifts = numpy.arange(8 - bits, -1, -bits, dtype=numpy.uint8)
+    values = values.ravel().astype(numpy.uint8)
+    if partial and values.size % per_byte:
+        fill_values = (numpy.uint8(fill) >> shifts) & numpy.uint8((1 << bits) - 1)
+        values = numpy.concatenate((values, fill_values[values.size % per_byte:]))
+
+    count = min(values.size // per_byte, length)
+    values = values[:count * per_byte].reshape(count, per_byte)
+    buffer = bytearray([fill]) * length
+    buffer[:count] = numpy.bitwise_or.reduce(values << shifts, axis=1).astype(numpy.uint8).tobytes()
+    return buffer
+
+
+def pack_1bit(image: Image, width: int, height: int, invert: bool = False) -> bytearray:
+    """Packs an image into a buffer with 1 bit per pixel (1 = white, or 1 = black if inverted).
+
+    Returns a white buffer if the image does not fit the panel.
+    """
+    length = int(width / 8) * height
+    pixels = _orient(numpy.asarray(image.convert('1')), width, height)
+    if pixels is None:
+        return bytearray([0x00 if invert else 0xFF]) * length
+    return _pack(pixels != invert, 1, length, 0x00 if invert else 0xFF)
+
+
+def pack_2bit(image: Image, width: int, height: int) -> bytearray:
+    """Packs an image into a buffer with 2 bits per pixel, black = 00 and white = 11.
+
+    Returns a black buffer if the image does not fit the panel.
+    """
+    length = int(width * height / 4)
+    pixels = _orient(numpy.asarray(image.convert('1')), width, height)
+    if pixels is None:
+        return bytearray(length)
+    return _pack(pixels * numpy.uint8(0b11), 2, length, 0x00)
+
+
+def pack_4gray(image: Image, width: int, height: int, flip: bool = True) -> bytearray:
+    """Packs an image into a buffer with 4 grey levels (2 bits per pixel).
+
+    The grey levels are the highest 2 bits of each pixel, after mapping 0xC0 to 0x80 and
+    0x80 to 0x40. Returns a white buffer if the image does not fit the panel.
+    """
+    length = int(width / 4) * height
+    pixels = numpy.asarray(image.convert('L'))
+    pixels = numpy.where(pixels == 0xC0, 0x80, numpy.where(pixels == 0x80, 0x40, pixels))
+    pixels = _orient(pixels, width, height, flip)
+    if pixels is None:
+        return bytearray([0xFF]) * length
+    return _pack(pixels >> 6, 2, length, 0xFF, partial=False)
+
+
+def invert(buffer) -> bytearray:
+    """Returns a copy of a buffer (bytes or list of bytes) with all bits inverted"""
+    return bytearray(numpy.bitwise_not(numpy.frombuffer(bytes(buffer), dtype=numpy.uint8)).tobytes())
+
+
+def _unpack_2bit(buffer) -> numpy.ndarray:
+    """Returns the values of the pixels of a buffer with 2 bits per pixel"""
+    values = numpy.frombuffer(bytes(buffer), dtype=numpy.uint8)
+    return ((values[:, None] >> numpy.array([6, 4, 2, 0], dtype=numpy.uint8)) & 0b11).ravel()
+
+
+def _nibbles(codes: numpy.ndarray) -> bytearray:
+    """Packs codes of 4 bits per pixel, two pixels per byte, first pixel in the high nibble"""
+    codes = codes.astype(numpy.uint8).reshape(-1, 2)
+    return bytearray(((codes[:, 0] << 4) | codes[:, 1]).tobytes())
+
+
+def expand_2bit(buffer) -> bytearray:
+    """Expands a buffer of pack_2bit to 4 bits per pixel: black = 0x0, white = 0x3, everything else 0x4"""
+    return _nibbles(numpy.array([0x0, 0x4, 0x4, 0x3], dtype=numpy.uint8)[_unpack_2bit(buffer)])
+
+
+def merge_colour(black, red) -> bytearray:
+    """Merges the 1 bit buffers of the black and the red pixels to 4 bits per pixel.
+
+    Red pixels (0 in red) are 0x4, other black pixels (0 in black) 0x0 and white pixels 0x3.
+    """
+    black = numpy.unpackbits(numpy.frombuffer(bytes(black), dtype=numpy.uint8))
+    red = numpy.unpackbits(numpy.frombuffer(bytes(red), dtype=numpy.uint8))
+    return _nibbles(numpy.where(red == 0, 0x4, numpy.where(black == 0, 0x0, 0x3)))
+
+
+def split_4gray(buffer) -> tuple:
+    """Splits a buffer of pack_4gray into two buffers with 1 bit per pixel.
+
+    Returns:
+        tuple: the buffer of the high bits and the buffer of the low bits of the grey levels.
+    """
+    pixels = _unpack_2bit(buffer)
+    return bytearray(numpy.packbits(pixels >> 1).tobytes()), bytearray(numpy.packbits(pixels & 1).tobytes())
+
+
+def window(buffer, columns: int, rows: int, x_start: int, y_start: int, x_end: int, y_end: int) -> bytes:
+    """Returns the bytes of a buffer with columns bytes per row inside a window, row by row.
+
+    The window includes the start and the end column and row.
+    """
+    values = numpy.frombuffer(bytes(buffer), dtype=numpy.uint8)[:columns * rows].reshape(rows, columns)
+    return values[max(y_start, 0):y_end + 1, max(x_start, 0):x_end + 1].tobytes()
+
+
+def quadrants(buffer, columns: int, rows: int, split_column: int, split_row: int) -> tuple:
+    """Splits a buffer with columns bytes per row into four quadrants, each row by row.
+
+    The right quadrants start at split_column, the bottom ones at split_row.
+
+    Returns:
+        tuple: the bytes of the top left, top right, bottom left and bottom right quadrant.
+    """
+    values = numpy.frombuffer(bytes(buffer), dtype=numpy.uint8)[:columns * rows].reshape(rows, columns)
+    top, bottom = values[:split_row], values[split_row:]
+    return (top[:, :split_column].tobytes(), top[:, split_column:].tobytes(),
+            bottom[:, :split_column].tobytes(), bottom[:, split_column:].tobytes())
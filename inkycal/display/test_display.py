@@ -1,6 +1,18 @@
-from unittest import TestCase
+import asyncio
+import os
+from unittest import TestCase, mock
+
+import numpy
+from PIL import Image, ImageDraw
 
 from inkycal import Display
+from inkycal.display.benchmark import benchmark_drivers
+from inkycal.display.drivers.busy import BusyTimeoutError
+from inkycal.display.drivers.epdconfig_mock import BACKEND_VARIABLE, MockBackend
+from inkycal.display.drivers.packing import (
+    expand_2bit, invert, merge_colour, pack_1bit, pack_2bit, pack_4gray, quadrants, split_4gray, window
+)
+from inkycal.utils import Metrics
 
 
 class TestDisplay(TestCase):
@@ -12,4 +24,211 @@ class TestDisplay(TestCase):
 
         fetched_displays = Display.get_display_names()
         assert len(fetched_displays) >1
-        assert isinstance(fetched_displays, list)
\ No newline at end of file
+        assert isinstance(fetched_displays, list)
+
+    def test_changed_regions(self):
+        row_bytes, rows = 10, 100
+        previous = numpy.full(row_bytes * rows, 0xFF, dtype=numpy.uint8)
+
+        # identical frames do not need any refresh
+        assert Display._changed_regions(previous, previous.copy(), row_bytes) == []
+
+        # one changed pixel in row 5, column 20 -> byte 2 of that row
+        current = previous.copy()
+        current[5 * row_bytes + 2] = 0xF7
+        assert Display._changed_regions(previous, current, row_bytes) == [(16, 5, 24, 6)]
+
+        # changes far apart are refreshed as separate regions
+        current[90 * row_bytes + 9] = 0x00
+        assert Display._changed_regions(previous, current, row_bytes) == [(16, 5, 24, 6), (72, 90, 80, 91)]
+
+    def test_render_async(self):
+        display = Display("image_file")
+        image = Image.new("RGB", Display.get_display_size("image_file"), "white")
+        if os.path.exists("display_image.png"):
+            os.remove("display_image.png")
+
+        asyncio.run(display.render_async(image))
+        assert os.path.exists("display_image.png")
+        for filename in ("display_image.png", "getbuffer_image.png"):
+            os.remove(filename)
+
+    def test_skip_unchanged(self):
+        display = Display("image_file", skip_unchanged=True)
+        image = Image.new("RGB", Display.get_display_size("image_file"), "white")
+        display.render(image)
+        assert display.frame_digest is not None
+        os.remove("display_image.png")
+
+        # the same frame is not sent to the display again
+        display.render(image)
+        assert not os.path.exists("display_image.png")
+        os.remove("getbuffer_image.png")
+
+
+def _pixels(image, width, height, flip=True):
+    """Pixels of an image in the order the drivers used to pack them (row by row on the panel)"""
+    pixels = image.load()
+    if image.size == (width, height):
+        return [pixels[x, y] for y in range(height) for x in range(width)]
+    if flip:
+        return [pixels[height - y - 1, x] for y in range(height) for x in range(width)]
+    return [pixels[y, x] for y in range(height) for x in range(width)]
+
+
+class TestPacking(TestCase):
+
+    width, height = 24, 10
+
+    def setUp(self):
+        rng = numpy.random.default_rng(0)
+        grey = rng.choice([0x00, 0x40, 0x80, 0xC0, 0xFF], size=(self.height, self.width)).astype(numpy.uint8)
+        self.image = Image.fromarray(grey, "L")
+        self.landscape = self.image.rotate(-90, expand=True)
+
+    def test_pack_1bit(self):
+        for image in (self.image, self.landscape):
+            bits = [1 if pixel else 0 for pixel in _pixels(image.convert("1"), self.width, self.height)]
+            expected = bytes(numpy.packbits(bits))
+            assert bytes(pack_1bit(image, self.width, self.height)) == expected
+            assert bytes(pack_1bit(image, self.width, self.height, invert=True)) == bytes(invert(expected))
+
+        # images which do not fit are shown blank
+        assert set(pack_1bit(Image.new("L", (8, 8)), self.width, self.height)) == {0xFF}
+
+    def test_pack_2bit(self):
+        bits = [bit for pixel in _pixels(self.image.convert("1"), self.width, self.height) for bit in [pixel > 0] * 2]
+        assert bytes(pack_2bit(self.image, self.width, self.height)) == bytes(numpy.packbits(bits))
+
+    def test_pack_4gray(self):
+        levels = {0xC0: 0x80, 0x80: 0x40}
+        for image in (self.image, self.landscape):
+            for flip in (True, False):
+                codes = [levels.get(pixel, pixel) >> 6 for pixel in _pixels(image, self.width, self.height, flip)]
+                expected = bytes(
+                    codes[i] << 6 | codes[i + 1] << 4 | codes[i + 2] << 2 | codes[i + 3] for i in range(0, len(codes), 4)
+                )
+                assert bytes(pack_4gray(image, self.width, self.height, flip)) == expected
+
+    def test_expand_2bit(self):
+        # black, grey, grey, white -> one nibble per pixel
+        assert bytes(expand_2bit(bytes([0b00011011]))) == bytes([0x04, 0x43])
+
+    def test_merge_colour(self):
+        # red wins over black, pixels neither red nor black are white
+        black, red = bytes([0b00110011]), bytes([0b01010101])
+        assert bytes(merge_colour(black, red)) == bytes([0x40, 0x43, 0x40, 0x43])
+
+    def test_split_4gray(self):
+        high, low = split_4gray(bytes([0b00011011, 0b11100100]))
+        assert (bytes(high), bytes(low)) == (bytes([0b00111100]), bytes([0b01011010]))
+
+    def test_window(self):
+        buffer = bytes(range(20))  # 4 rows of 5 bytes
+        assert window(buffer, 5, 4, 1, 1, 2, 2) == bytes([6, 7, 11, 12])
+        assert window(buffer, 5, 4, -1, 3, 9, 9) == bytes([15, 16, 17, 18, 19])
+
+    def test_quadrants(self):
+        buffer = bytes(range(20))  # 4 rows of 5 bytes
+        assert quadrants(buffer, 5, 4, 2, 1) == (
+            bytes([0, 1]), bytes([2, 3, 4]), bytes([5, 6, 10, 11, 15, 16]), bytes([7, 8, 9, 12, 13, 14, 17, 18, 19])
+        )
+
+
+class TestMockBackend(TestCase):
+
+    def test_recording(self):
+        mock = MockBackend(((8, 25),), (24,), model="epd_7_in_5_v2")
+        mock.digital_write(25, 0)
+        mock.spi_writebyte([0x10])
+        mock.digital_write(25, 1)
+        mock.spi_writebytes_bulk(bytes(5000))
+        mock.digital_write(17, 1)
+
+        assert mock.transfers == [[0, (), bytearray([0x10])], [1, (), bytearray(5000)]]
+        assert mock.spi_writes == 3  # the bulk write is split into transfers of bufsiz bytes
+        assert mock.data() == bytes(5000)
+        assert mock.events == [(0.0, "gpio", (17, 1))]
+
+    def test_busy(self):
+        mock = MockBackend(((8, 25),), (24,), model="epd_7_in_5_v2")
+        assert mock.digital_read(24) == 1  # idle
+
+        # the refresh keeps the panel busy (low) for the refresh time of the panel
+        mock.digital_write(25, 0)
+        mock.spi_writebyte([0x12])
+        assert mock.digital_read(24) == 0
+        assert mock.digital_read(24) == 1
+        assert mock.busy_time == mock.clock == 5.0
+
+    def test_busy_timeout(self):
+        mock = MockBackend(((8, 25),), (24,), model="epd_7_in_5_v2")
+        mock.digital_write(25, 0)
+        mock.spi_writebyte([0x12])
+        assert mock.wait_busy(24, 0) == 5.0
+        assert mock.wait_busy(24, 0) == 0.0
+
+        # a panel which never releases the busy pin
+        mock.stuck = True
+        with self.assertRaises(BusyTimeoutError):
+            mock.wait_busy(24, 0, timeout=10)
+        assert mock.clock == 15.0
+
+    @mock.patch.dict(os.environ, {BACKEND_VARIABLE: "mock"})
+    def test_busy_metric(self):
+        metrics = Metrics(name="test_display_metrics")
+        try:
+            display = Display("epd_7_in_5_v2", metrics=metrics)
+            metrics.start_cycle()
+            display.render(Image.new("1", Display.get_display_size("epd_7_in_5_v2"), 1))
+            record = metrics.end_cycle()
+            assert "busy" in record["stages"]
+            assert "spi_transfer" in record["stages"]
+        finally:
+            for path in (metrics.jsonl_path, metrics.prometheus_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @mock.patch.dict(os.environ, {BACKEND_VARIABLE: "mock"})
+    def test_partial_unchanged(self):
+        from inkycal.display.drivers import epdconfig
+
+        display = Display("epd_13_in_3", partial_refresh=True)
+        image = Image.new("1", Display.get_display_size("epd_13_in_3"), 1)
+        display.render(image)
+
+        # an unchanged frame neither wakes the E-Paper up nor sends it to sleep
+        recording = epdconfig.implementation
+        recording.reset()
+        display.render(image)
+        assert recording.events == [] and recording.spi_writes == 0
+
+    @mock.patch.dict(os.environ, {BACKEND_VARIABLE: "mock"})
+    def test_partial_standby(self):
+        from inkycal.display.drivers import epdconfig
+
+        display = Display("epd_13_in_3", partial_refresh=True)
+        size = Display.get_display_size("epd_13_in_3")
+        recording = epdconfig.implementation
+        recording.reset()
+        display.render(Image.new("1", size, 1))
+        changed = Image.new("1", size, 1)
+        ImageDraw.Draw(changed).rectangle((10, 10, 100, 40), fill=0)
+        display.render(changed)
+
+        # deep sleep would clear the RAM the partial refresh compares against
+        commands = b"".join(bytes(data) for dc, cs, data in recording.transfers if not dc)
+        assert 0x10 not in commands
+        assert ("exit", None) not in [event[1:] for event in recording.events]
+
+        recording.reset()
+        display.sleep()
+        assert ("exit", None) in [event[1:] for event in recording.events]
+
+    @mock.patch.dict(os.environ, {BACKEND_VARIABLE: "mock"})
+    def test_benchmark(self):
+        report = benchmark_drivers(["epd_4_in_2_colour", "epd_7_in_5_v2", "epd_13_in_3"], repeat=1)
+        assert report["mismatches"] == []
+        for result in report["models"].values():
+            assert result["reference"] == "ok"
+            assert result["busy"] > 0
@@ -7,14 +7,23 @@ import asyncio
 import glob
 import hashlib
 import os.path
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
 import numpy
 
 from inkycal import loggers  # noqa
 from inkycal.custom import *
 from inkycal.display import Display
+from inkycal.display.drivers.epdconfig_mock import BACKEND_VARIABLE
+from inkycal.modules import load_module
 from inkycal.modules.inky_image import Inkyimage as Images
-from inkycal.utils import JSONCache
+from inkycal.modules.process_pool import DEFAULT_ISOLATED, ModuleProcessPool
+from inkycal.utils import BitmapStore, ControlServer, JSONCache, MemoryProfiler, Metrics
+from inkycal.utils.control import DEFAULT_SOCKET
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +76,7 @@ class Inkycal:
             try:
                 with open(settings_path, mode="r") as settings_file:
                     self.settings = json.load(settings_file)
+                self.settings_path = settings_path
 
             except FileNotFoundError:
                 raise FileNotFoundError(
@@ -79,6 +89,7 @@ class Inkycal:
                     logger.info(f"Found settings.json file in {location}")
                     with open(location, mode="r") as settings_file:
                         self.settings = json.load(settings_file)
+                    self.settings_path = location
                     found = True
                     break
             if not found:
@@ -99,13 +110,78 @@ class Inkycal:
 
         self.show_border = self.settings.get('border_around_modules', False)
 
+        # Number of worker threads used to generate the module images concurrently
+        self.module_workers = self.settings.get('module_workers', 4)
+        self._executor = ThreadPoolExecutor(max_workers=self.module_workers, thread_name_prefix="inkycal_module")
+
+        # Modules which are not thread-safe (e.g. matplotlib) are generated one after another
+        self._serial_lock = threading.Lock()
+
+        # Heavy modules (e.g. matplotlib) run in worker processes, which are replaced after some
+        # cycles to free the memory they accumulated
+        self.isolated_modules = self.settings.get('isolated_modules', list(DEFAULT_ISOLATED))
+        self._process_pool = ModuleProcessPool(
+            workers=self.settings.get('module_processes', 1),
+            recycle_after=self.settings.get('recycle_processes_after', 24)
+        )
+
+        # Images generated by each module, handed to _assemble in memory
+        self._module_images = {}
+
+        # Time (time.monotonic) of the last generated image of each module, used for refresh intervals
+        self._module_updates = {}
+
+        # Digests of the images of each module, unchanged modules are not drawn again
+        self._module_digests = {}
+
+        # Maximum time in seconds a module may take to generate its image before its last image is used
+        self.module_deadline = self.settings.get('module_deadline', 120)
+        self._running = {}  # position -> future of the module's current run
+
+        # Optionally start generating the next frame ahead of the update interval, so the display
+        # refreshes right on time. The lead time is estimated from the recent cycles.
+        self.prefetch = self.settings.get('prefetch', False)
+        self.max_prefetch_lead = self.settings.get('max_prefetch_lead', 120)
+        self._prepare_durations = deque(maxlen=10)
+
+        # Optionally save the generated images as PNG files in the image folder (for debugging/exporting).
+        # Off by default to spare the SD card. Saving happens in the background, so it does not delay
+        # rendering on the display.
+        self.export_images = self.settings.get('export_images', False)
+        self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inkycal_export")
+        self._exports = []
+
+        # Create full-screen.png (black and colour band combined) when exporting images
+        self.full_screen_preview = self.settings.get('full_screen_preview', True)
+        self._buffers = None  # reused by _post_process
+
         self.cleanup()
 
+        # Record the duration of each stage of a cycle, written to the cache folder
+        self.metrics = Metrics()
+
+        # Optionally record the memory used by each module, to find modules leaking memory.
+        # Send SIGUSR1 to the process to write a report of the largest allocation sites.
+        # Modules keep running concurrently, so the values of overlapping modules are approximate.
+        self.memory_profiling = self.settings.get('memory_profiling', False)
+        self.memory_profiler = MemoryProfiler(self.metrics) if self.memory_profiling else None
+
         # Load drivers if image should be rendered
         if self.render:
+            # "mock" runs the driver without an E-Paper, recording what would be sent to it.
+            # The environment variable INKYCAL_EPD_BACKEND takes precedence.
+            if 'epd_backend' in self.settings:
+                os.environ.setdefault(BACKEND_VARIABLE, self.settings['epd_backend'])
+
             # Init Display class with model in settings file
             # from inkycal.display import Display
-            self.Display = Display(self.settings["model"])
+            self.Display = Display(
+                self.settings["model"],
+                partial_refresh=self.settings.get('partial_refresh', False),
+                full_refresh_interval=self.settings.get('full_refresh_interval', 10),
+                metrics=self.metrics,
+                skip_unchanged=self.settings.get('image_hash', False)
+            )
 
             # check if colours can be rendered
             self.supports_colour = True if 'colour' in self.settings['model'] else False
@@ -117,33 +193,22 @@ class Inkycal:
             self._calibration_state = False
 
         # Load and initialise modules specified in the settings file
-        self._module_number = 1
+        self.modules = {}  # position -> module instance
+        self._module_entries = {}  # position -> entry in the settings file the module was created from (JSON)
         for module in self.settings['modules']:
-            module_name = module['name']
-            try:
-                loader = f'from inkycal.modules import {module_name}'
-                # print(loader)
-                exec(loader)
-                setup = f'self.module_{self._module_number} = {module_name}({module})'
-                # print(setup)
-                exec(setup)
-                width = module['config']['size'][0]
-                height = module['config']['size'][1]
-                logger.info(f'name : {module_name} size : {width}x{height} px')
-
-                self._module_number += 1
-
-            # If a module was not found, print an error message
-            except ImportError:
-                logger.exception(f'Could not find module: "{module}". Please try to import manually')
-
-            # If something unexpected happened, show the error message
-            except:
-                logger.exception(f"Exception: {traceback.format_exc()}.")
+            self._load_module(module)
 
-        # Remove old hashes
+        # Compute where the modules are placed on the display
+        self._compile_layout()
+
+        # Remove hash files of older versions
         self._remove_hashes(settings.IMAGE_FOLDER)
 
+        # Last good images of the modules from previous runs. They are shown until a module
+        # generates a new image, e.g. when there is no network connection after a reboot.
+        self.bitmap_store = BitmapStore()
+        self._load_bitmaps()
+
         # set up cache
         if not os.path.exists(os.path.join(settings.CACHE_PATH, CACHE_NAME)):
             if not os.path.exists(settings.CACHE_PATH):
@@ -153,6 +218,10 @@ class Inkycal:
 
         self.counter = 0 if "counter" not in self.cache_data else int(self.cache_data["counter"])
 
+        # The display still shows the frame of the last run, no need to refresh it with the same frame
+        if self.render:
+            self.Display.frame_digest = self.cache_data.get("frame_digest")
+
         self.use_pi_sugar = use_pi_sugar
         self.battery_capacity = 100
         self.shutdown_after_run = use_pi_sugar and shutdown_after_run
@@ -185,9 +254,47 @@ class Inkycal:
             if self.shutdown_after_run:
                 logger.warning("Shutdown after run enabled. System will shutdown after the run is complete.")
 
+        # Local control socket to force updates, calibrate or reload the settings without a restart,
+        # see `python -m inkycal control --help`. Set to null to disable it.
+        self.control_socket = self.settings.get('control_socket', DEFAULT_SOCKET)
+        self._wake = asyncio.Event()  # set to end the sleep between two updates early
+        self._calibrate_requested = False
+        self._reload_requested = False
+        self._last_record = None
+
+        # Apply changes of the settings file while running, only modules with a changed
+        # configuration are created again
+        self.watch_settings = self.settings.get('watch_settings', True)
+        self.settings_poll_interval = self.settings.get('settings_poll_interval', 5)
+        self._settings_modified = self._settings_mtime()
+
         # Give an OK message
         logger.info('Inkycal initialised successfully!')
 
+    def _load_module(self, module: dict) -> None:
+        """Loads and initialises a module specified in the settings file.
+
+        Only the modules used in the settings file are imported.
+        """
+        module_name = module['name']
+        self._module_entries[module['position']] = json.dumps(module, sort_keys=True)
+        try:
+            if module_name in self.isolated_modules:
+                self.modules[module['position']] = self._process_pool.module(module)
+            else:
+                self.modules[module['position']] = load_module(module_name)(module)
+            width = module['config']['size'][0]
+            height = module['config']['size'][1]
+            logger.info(f'name : {module_name} size : {width}x{height} px')
+
+        # If a module was not found, print an error message
+        except ImportError:
+            logger.exception(f'Could not find module: "{module}". Please try to import manually')
+
+        # If something unexpected happened, show the error message
+        except:
+            logger.exception(f"Exception: {traceback.format_exc()}.")
+
     def countdown(self, interval_mins: int = None) -> int:
         """Returns the remaining time in seconds until the next display update based on the interval.
 
@@ -231,8 +338,22 @@ class Inkycal:
         for each module and initializes the module. Tries to run the module and
         checks if the images could be generated correctly.
 
-        Generated images can be found in the /images folder of Inkycal.
+        With export_images enabled in the settings file, the generated images can be
+        found in the image folder of Inkycal.
+
+        Can be called from a running event loop as well (e.g. in a notebook), the modules
+        then run in an event loop of their own. In async code, use dry_run_async.
         """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.dry_run_async())
+            return
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="inkycal_dry_run") as runner:
+            runner.submit(asyncio.run, self.dry_run_async()).result()
+
+    async def dry_run_async(self):
+        """Tests if Inkycal can run without issues like dry_run, without blocking the event loop"""
         logger.info(f'Selected E-paper display: {self.settings["model"]}')
 
         # store module numbers in here
@@ -241,59 +362,51 @@ class Inkycal:
         # short info for info-section
         self.info = f"{arrow.now().format('D MMM @ HH:mm')}  "
 
-        for number in range(1, self._module_number):
-            name = eval(f"self.module_{number}.name")
-            success = self.process_module(number)
-            if success:
-                logger.debug(f'Image of module {name} generated successfully')
-            else:
-                logger.warning(f'Generating image of module {name} failed!')
-                errors.append(number)
-                self.info += f"module {number}: Error!  "
+        try:
+            failed, stale = await self._process_modules()
+            failed += stale
 
-        if errors:
-            logger.error('Error/s in modules:', *errors)
-        del errors
+            for number, module in self.modules.items():
+                name = module.name
+                if number not in failed:
+                    logger.debug(f'Image of module {name} generated successfully')
+                else:
+                    logger.warning(f'Generating image of module {name} failed!')
+                    errors.append(number)
+                    self.info += f"module {number}: Error!  "
+
+            if errors:
+                logger.error(f'Error/s in modules: {errors}')
+            del errors
 
-        self._assemble()
+            self._assemble()
 
-    def _image_hash(self, _in):
-        """Create a md5sum of a path or a bytes stream."""
-        if not isinstance(_in, str):
-            image_bytes = _in.tobytes()
-        else:
-            try:
-                with open(_in) as i:
-                    return i.read()
-            except FileNotFoundError:
-                image_bytes = None
-        return hashlib.md5(image_bytes).hexdigest() if image_bytes else ""
+            # wait until all images have been saved to the image folder
+            await asyncio.get_running_loop().run_in_executor(None, self._wait_for_exports)
+        finally:
+            self._abandon_workers()
 
-    def _remove_hashes(self, basepath):
+    @staticmethod
+    def _remove_hashes(basepath):
+        """Removes the .hash files of older versions, change detection uses digests in the cache now"""
         for _file in glob.glob(f"{basepath}/*.hash"):
             try:
                 os.remove(_file)
-            except:
+            except OSError:
                 pass
 
-    def _write_image_hash(self, path, _in):
-        """Write hash to a file."""
-        with open(path, "w") as o:
-            o.write(self._image_hash(_in))
-
-    def _needs_image_update(self, _list):
-        """Check if any image has been updated or not.
-        Input a list of tuples(str, image)."""
-        res = False
-        for item in _list:
-            _a = self._image_hash(item[0])
-            _b = self._image_hash(item[1])
-            print("{f1}:{h1} -> {h2}".format(f1=item[0], h1=_a, h2=_b))
-            if _a != _b:
-                res = True
-                self._write_image_hash(item[0], item[1])
-            print("Refresh needed: {a}".format(a=res))
-        return res
+    @staticmethod
+    def _image_digest(*images) -> str or None:
+        """Returns a digest of the given images (mode, size and pixels), None if there is no image"""
+        if not any(images):
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        for image in images:
+            if image is not None:
+                digest.update(f"{image.mode}{image.size}".encode())
+                digest.update(image.tobytes())
+            digest.update(b"|")
+        return digest.hexdigest()
 
     async def run(self, run_once=False):
         """Runs main program in nonstop mode or a single iteration based on the run_once flag.
@@ -315,269 +428,636 @@ class Inkycal:
         logger.info(f'Inkycal version: v{self._release}')
         logger.info(f'Selected E-paper display: {self.settings["model"]}')
 
-        while True:
-            logger.info("Starting new cycle...")
-            current_time = arrow.now(tz=get_system_tz())
-            logger.info(f"Timestamp: {current_time.format('HH:mm:ss DD.MM.YYYY')}")
-            self.cache_data["counter"] = self.counter
+        if self.memory_profiler:
+            self._handle_report_signal()
 
-            errors = []  # Store module numbers in here
+        control = await self._start_control() if not run_once else None
+        watcher = asyncio.create_task(self._watch_settings()) if self.watch_settings and not run_once else None
 
-            # Short info for info-section
-            if not self.settings.get('image_hash', False):
-                self.info = f"{current_time.format('D MMM @ HH:mm')}  "
-            else:
-                self.info = ""
+        # When prefetching, the time (time.monotonic) and arrow time at which the next update is due
+        update_due, update_time = None, None
 
-            for number in range(1, self._module_number):
-                success = self.process_module(number)
-                if not success:
-                    errors.append(number)
-                    self.info += f"im {number}: X  "
-
-            if errors:
-                logger.error("Error/s in modules:", *errors)
-                self.counter = 0
-                self.cache_data["counter"] = 0
-            else:
-                self.counter += 1
-                self.cache_data["counter"] += 1
-                logger.info("All images generated successfully!")
-            del errors
-
-            if self.use_pi_sugar:
-                self.battery_capacity = self.pisugar.get_battery() or 0
-                if self.battery_capacity < 20:
-                    self.info += f"Low battery! ({self.battery_capacity})% "
+        try:
+            while True:
+                logger.info("Starting new cycle...")
+                self.metrics.start_cycle()
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._reload_settings()
+                prepare_start = time.perf_counter()
+                current_time = update_time or arrow.now(tz=get_system_tz())
+                logger.info(f"Timestamp: {current_time.format('HH:mm:ss DD.MM.YYYY')}")
+                self.cache_data["counter"] = self.counter
+
+                # Short info for info-section
+                if not self.settings.get('image_hash', False):
+                    self.info = f"{current_time.format('D MMM @ HH:mm')}  "
                 else:
-                    self.info += f"Battery: {self.battery_capacity}% "
-
-            # Assemble image from each module - add info section if specified
-            self._assemble()
+                    self.info = ""
 
-            # Check if image should be rendered
-            if self.render:
-                logger.info("Attempting to render image on display...")
-                display = self.Display
-                self._calibration_check()
-                if self._calibration_state:
-                    # After calibration, we have to forcefully rewrite the screen
-                    self._remove_hashes(settings.IMAGE_FOLDER)
-
-                if self.supports_colour:
-                    im_black = Image.open(os.path.join(settings.IMAGE_FOLDER, "canvas.png"))
-                    im_colour = Image.open(os.path.join(settings.IMAGE_FOLDER, "canvas_colour.png"))
-
-                    # Flip the image by 180° if required
-                    if self.settings['orientation'] == 180:
-                        im_black = upside_down(im_black)
-                        im_colour = upside_down(im_colour)
-
-                    # Render the image on the display
-                    if not self.settings.get('image_hash', False) or self._needs_image_update([
-                        (f"{settings.IMAGE_FOLDER}/canvas.png.hash", im_black),
-                        (f"{settings.IMAGE_FOLDER}/canvas_colour.png.hash", im_colour)
-                    ]):
-                        display.render(im_black, im_colour)
-
-                # Part for black-white ePapers
-                else:
-                    im_black = self._merge_bands()
-
-                    # Flip the image by 180° if required
-                    if self.settings['orientation'] == 180:
-                        im_black = upside_down(im_black)
-
-                    if not self.settings.get('image_hash', False) or self._needs_image_update([
-                        (f"{settings.IMAGE_FOLDER}/canvas.png.hash", im_black), ]):
-                        display.render(im_black)
-
-            logger.info(f'No errors since {self.counter} display updates')
-            logger.info(f'program started {runtime.humanize()}')
-
-            # store the cache data
-            self.cache.write(self.cache_data)
-
-            # Exit the loop if run_once is True
-            if run_once:
-                break  # Exit the loop after one full cycle if run_once is True
-
-            sleep_time = self.countdown()
-
-            if self.use_pi_sugar:
-                sleep_time_rtc = arrow.now(tz=get_system_tz()).shift(seconds=sleep_time)
-                result = self.pisugar.rtc_alarm_set(sleep_time_rtc, 127)
-                if result:
-                    logger.info(f"Alarm set for {sleep_time_rtc.format('HH:mm:ss')}")
-                    if self.shutdown_after_run:
-                        logger.warning("System shutdown in 5 seconds!")
-                        time.sleep(5)
-                        self._shutdown_system()
-                        break
+                # Generate the images of all modules concurrently, store failed module numbers
+                errors, stale = await self._process_modules()
+                for number in errors:
+                    self.info += f"im {number}: X  "
+                for number in stale:
+                    self.info += f"im {number}: stale  "
+
+                self.metrics.set("failed_modules", len(errors))
+                if errors:
+                    logger.error(f"Error/s in modules: {errors}")
+                    self.counter = 0
+                    self.cache_data["counter"] = 0
                 else:
-                    logger.warning(f"Failed to set alarm for {sleep_time_rtc.format('HH:mm:ss')}")
+                    self.counter += 1
+                    self.cache_data["counter"] += 1
+                    logger.info("All images generated successfully!")
+                del errors
+
+                if self.use_pi_sugar:
+                    self.battery_capacity = self.pisugar.get_battery() or 0
+                    if self.battery_capacity < 20:
+                        self.info += f"Low battery! ({self.battery_capacity})% "
+                    else:
+                        self.info += f"Battery: {self.battery_capacity}% "
+
+                # Assemble image from each module - add info section if specified
+                with self.metrics.timer("assemble"):
+                    im_black, im_colour = self._assemble()
+                self._prepare_durations.append(time.perf_counter() - prepare_start)
+
+                # A prefetched frame is held back until the update is due
+                if update_due is not None:
+                    with self.metrics.timer("prefetch_wait"):
+                        await self._wait_until(update_due)
+
+                # The display is updated in the background, see below
+                render_task = None
+
+                # Check if image should be rendered
+                if self.render:
+                    logger.info("Attempting to render image on display...")
+                    # After calibration, the display has to be refreshed even if the frame did not change
+                    self._calibration_check()
+                    force_refresh = self._calibration_state
+                    if self._calibrate_requested:
+                        self._calibrate_requested = False
+                        await self.Display.calibrate_async()
+                        force_refresh = True
+
+                    if self.settings.get('image_hash', False) and not self._frame_changed and not force_refresh:
+                        logger.info("Frame unchanged, not refreshing the display")
+
+                    elif self.supports_colour:
+                        # Flip the image by 180° if required
+                        if self.settings['orientation'] == 180:
+                            im_black = upside_down(im_black)
+                            im_colour = upside_down(im_colour)
+
+                        # Render the image on the display
+                        render_task = asyncio.create_task(self._render_frame(im_black, im_colour))
+
+                    # Part for black-white ePapers
+                    else:
+                        im_black = self._merge_bands(im_black, im_colour)
+
+                        # Flip the image by 180° if required
+                        if self.settings['orientation'] == 180:
+                            im_black = upside_down(im_black)
+
+                        render_task = asyncio.create_task(self._render_frame(im_black))
+
+                # Bookkeeping is done while the display is refreshing
+                logger.info(f'No errors since {self.counter} display updates')
+                logger.info(f'program started {runtime.humanize()}')
+
+                # store the cache data
+                self.cache.write(self.cache_data)
+
+                # Time (time.monotonic and arrow) of the next update, the countdown runs during the refresh
+                if not run_once:
+                    sleep_time = self.countdown()
+                    next_update = time.monotonic() + sleep_time
+                    next_update_time = arrow.now(tz=get_system_tz()).shift(seconds=sleep_time)
+
+                if render_task is not None:
+                    await render_task
+
+                    # Remember what the display shows across restarts
+                    if self.Display.frame_digest != self.cache_data.get("frame_digest"):
+                        self.cache_data["frame_digest"] = self.Display.frame_digest
+                        self.cache.write(self.cache_data)
+
+                if self.memory_profiler:
+                    self.memory_profiler.sample()
+                record = self._last_record = self.metrics.end_cycle()
+                logger.info(f"Cycle took {record['duration']:.2f}s (p50 of recent cycles: {record['percentiles']['p50']:.2f}s)")
+
+                # Exit the loop if run_once is True
+                if run_once:
+                    # the images are saved before the export thread is stopped
+                    await asyncio.get_running_loop().run_in_executor(None, self._wait_for_exports)
+                    break  # Exit the loop after one full cycle if run_once is True
+
+                if self.use_pi_sugar:
+                    sleep_time_rtc = next_update_time
+                    result = self.pisugar.rtc_alarm_set(sleep_time_rtc, 127)
+                    if result:
+                        logger.info(f"Alarm set for {sleep_time_rtc.format('HH:mm:ss')}")
+                        if self.shutdown_after_run:
+                            logger.warning("System shutdown in 5 seconds!")
+                            time.sleep(5)
+                            if control is not None:
+                                await control.close()
+                            if watcher is not None:
+                                watcher.cancel()
+                            self._shutdown_system()
+                            break
+                    else:
+                        logger.warning(f"Failed to set alarm for {sleep_time_rtc.format('HH:mm:ss')}")
+
+                wake_up = next_update
+                if self.prefetch:
+                    lead = min(self._prefetch_lead(), sleep_time)
+                    update_due, update_time = next_update, next_update_time
+                    logger.info(f"Preparing the next frame {lead:.1f}s ahead of the update")
+                    wake_up -= lead
+
+                if await self._sleep(wake_up - time.monotonic()):
+                    # Update requested on the control socket, show the new frame right away
+                    update_due, update_time = None, None
+        finally:
+            self._abandon_workers()
+            # the E-Paper may be in standby for partial refreshes
+            if self.render:
+                self.Display.sleep()
 
-            await asyncio.sleep(sleep_time)
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleeps for the given seconds, or until a command on the control socket requests an update.
 
-    @staticmethod
-    def _merge_bands():
-        """Merges black and coloured bands for black-white ePapers
-        returns the merged image
+        Returns:
+            True if the sleep was ended early.
         """
+        try:
+            await asyncio.wait_for(self._wake.wait(), max(0.0, seconds))
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._wake.clear()
+
+    async def _start_control(self):
+        """Starts listening on the control socket, returns the server or None if it is disabled"""
+        if not self.control_socket:
+            return None
+        control = ControlServer(self.control_socket, self._control)
+        try:
+            await control.start()
+        except (OSError, RuntimeError, NotImplementedError, AttributeError):
+            logger.exception("Could not open the control socket, control commands are not available")
+            return None
+        return control
+
+    async def _control(self, command: str, args: list) -> dict:
+        """Handles a command received on the control socket.
+
+        Commands:
+            refresh [position]: Update the display now, optionally generating the image of the
+                module at the given position again even if its refresh interval did not expire.
+            calibrate: Calibrate the display, then show the current frame.
+            reload: Read the settings file again and update the display.
+            metrics: The metrics of the last cycle.
+            memory-report: Write a memory report, requires memory_profiling.
+        """
+        if command == "refresh":
+            if args:
+                number = int(args[0])
+                if number not in self.modules:
+                    raise ValueError(f"No module at position {number}")
+                self._module_updates.pop(number, None)
+            self._wake.set()
+            return {}
+
+        if command == "calibrate":
+            if not self.render:
+                raise ValueError("Inkycal is not rendering on a display")
+            self._calibrate_requested = True
+            self._wake.set()
+            return {}
+
+        if command == "reload":
+            self._reload_requested = True
+            self._wake.set()
+            return {}
+
+        if command == "metrics":
+            return {"metrics": self._last_record}
+
+        if command == "memory-report":
+            if self.memory_profiler is None:
+                raise ValueError("memory_profiling is not enabled in the settings file")
+            path = await asyncio.get_running_loop().run_in_executor(None, self.memory_profiler.write_report)
+            return {"path": path}
+
+        raise ValueError(f"Unknown command: {command}")
+
+    def _settings_mtime(self) -> int or None:
+        """Returns the time the settings file was last modified (ns), None if it can not be read"""
+        try:
+            return os.stat(self.settings_path).st_mtime_ns
+        except OSError:
+            return None
 
-        im1_path = os.path.join(settings.IMAGE_FOLDER, "canvas.png")
-        im2_path = os.path.join(settings.IMAGE_FOLDER, "canvas_colour.png")
-
-        # If there is an image for black and colour, merge them
-        if os.path.exists(im1_path) and os.path.exists(im2_path):
+    async def _watch_settings(self) -> None:
+        """Polls the modification time of the settings file and requests a reload when it changed"""
+        while True:
+            await asyncio.sleep(self.settings_poll_interval)
+            if self._settings_mtime() != self._settings_modified:
+                logger.info("The settings file changed")
+                self._reload_requested = True
+                self._wake.set()
+
+    def _reload_settings(self) -> None:
+        """Reads the settings file again and applies it without a restart.
+
+        Only the modules whose entry in the settings file changed are created again. The other
+        modules keep their instances and images, the display driver is kept as well.
+        Options read at start-up, e.g. the display model, still require a restart.
+        """
+        logger.info(f"Reloading settings from {self.settings_path}")
+        self._settings_modified = self._settings_mtime()
+        try:
+            with open(self.settings_path, mode="r") as settings_file:
+                new_settings = json.load(settings_file)
+        except (OSError, ValueError):
+            logger.exception("Could not read the settings file, keeping the current settings")
+            return
 
-            im1 = Image.open(im1_path).convert('RGBA')
-            im2 = Image.open(im2_path).convert('RGBA')
+        if new_settings.get("model") != self.settings.get("model"):
+            logger.warning("Changing the display model requires a restart of Inkycal")
+            new_settings["model"] = self.settings["model"]
 
-            im1 = Images.merge(im1, im2)
+        # Check the new settings before changing anything, invalid settings are not applied at all
+        try:
+            entries = {module['position']: module for module in new_settings['modules']}
+            self._plan_layout(new_settings)
+        except Exception:
+            logger.exception("The settings file is not valid, keeping the current settings")
+            return
 
-        # If there is no image for the coloured-band, return the bw-image
-        elif os.path.exists(im1_path) and not os.path.exists(im2_path):
-            im1 = Image.open(im1_path).convert('RGBA')
+        changed = [
+            number for number, module in entries.items()
+            if self._module_entries.get(number) != json.dumps(module, sort_keys=True)
+        ]
+        removed = [number for number in self._module_entries if number not in entries]
+
+        for number in changed + removed:
+            self.modules.pop(number, None)
+            self._module_entries.pop(number, None)
+            self._module_images.pop(number, None)
+            self._module_updates.pop(number, None)
+            self._module_digests.pop(number, None)
+            self._running.pop(number, None)
+
+        self.settings = new_settings
+        for number in changed:
+            self._load_module(entries[number])
+        self._compile_layout()
+        self._load_bitmaps(changed)
+        logger.info(f"Settings reloaded, changed modules: {changed or 'none'}, removed modules: {removed or 'none'}")
+
+    async def _render_frame(self, im_black: Image, im_colour: Image or None = None) -> None:
+        """Renders the frame on the display without blocking the event loop"""
+        with self.metrics.timer("render"):
+            await self.Display.render_async(im_black, im_colour)
+
+    def _prefetch_lead(self) -> float:
+        """Estimates how many seconds ahead of an update the next frame has to be prepared.
+
+        Uses the 90th percentile of the recent preparation times plus a safety margin,
+        limited to max_prefetch_lead.
+        """
+        if not self._prepare_durations:
+            return 0.0
+        estimate = float(numpy.percentile(self._prepare_durations, 90))
+        return min(estimate * 1.25 + 2, self.max_prefetch_lead)
 
+    @staticmethod
+    async def _wait_until(due: float) -> None:
+        """Waits until the given time (time.monotonic)"""
+        remaining = due - time.monotonic()
+        if remaining > 0:
+            logger.info(f"Frame ready {remaining:.1f}s early, waiting for the update")
+            await asyncio.sleep(remaining)
         else:
-            raise FileNotFoundError("Inkycal cannot find images to merge")
-
-        return im1
-
-    def _assemble(self):
-        """Assembles all sub-images to a single image"""
-
-        # Create 2 blank images with the same resolution as the display
-        width, height = Display.get_display_size(self.settings["model"])
-
-        # Since Inkycal runs in vertical mode, switch the height and width
-        width, height = height, width
-
-        im_black = Image.new('RGB', (width, height), color='white')
-        im_colour = Image.new('RGB', (width, height), color='white')
-
-        # Set cursor for y-axis
-        im1_cursor = 0
-        im2_cursor = 0
-
-        for number in range(1, self._module_number):
-
-            # get the path of the current module's generated images
-            im1_path = os.path.join(settings.IMAGE_FOLDER, f"module{number}_black.png")
-            im2_path = os.path.join(settings.IMAGE_FOLDER, f"module{number}_colour.png")
-
-            # Check if there is an image for the black band
-            if os.path.exists(im1_path):
-
-                # Get actual size of image
-                im1 = Image.open(im1_path).convert('RGBA')
-                im1_size = im1.size
-
-                # Get the size of the section
-                section_size = [i for i in self.settings['modules'] if i['position'] == number][0]['config']['size']
+            logger.warning(f"Frame was ready {-remaining:.1f}s late")
 
-                # Calculate coordinates to center the image
-                x = int((section_size[0] - im1_size[0]) / 2)
-
-                # If this is the first module, use the y-offset
-                if im1_cursor == 0:
-                    y = int((section_size[1] - im1_size[1]) / 2)
-                else:
-                    y = im1_cursor + int((section_size[1] - im1_size[1]) / 2)
-
-                # center the image in the section space
-                im_black.paste(im1, (x, y), im1)
-
-                # Shift the y-axis cursor at the beginning of next section
-                im1_cursor += section_size[1]
+    @staticmethod
+    def _merge_bands(im_black: Image, im_colour: Image or None = None) -> Image:
+        """Merges black and coloured bands for black-white ePapers
+        returns the merged image
+        """
+        if im_black.mode == 'L' and (im_colour is None or im_colour.mode == 'L'):
+            # non-white pixels of the coloured band are shown instead of the black band
+            if im_colour is None:
+                return im_black
+            black, colour = numpy.asarray(im_black), numpy.asarray(im_colour)
+            return Image.fromarray(numpy.where(colour != 255, colour, black))
 
-            # Check if there is an image for the coloured band
-            if os.path.exists(im2_path):
+        im1 = im_black.convert('RGBA')
 
-                # Get actual size of image
-                im2 = Image.open(im2_path).convert('RGBA')
-                im2_size = im2.size
+        # If there is an image for the coloured-band, merge it with the bw-image
+        if im_colour is not None:
+            im1 = Images.merge(im1, im_colour.convert('RGBA'))
 
-                # Get the size of the section
-                section_size = [i for i in self.settings['modules'] if i['position'] == number][0]['config']['size']
+        return im1
 
-                # Calculate coordinates to center the image
-                x = int((section_size[0] - im2_size[0]) / 2)
+    def _abandon_workers(self) -> None:
+        """Stops the threads generating the module images and saving the images.
 
-                # If this is the first module, use the y-offset
-                if im2_cursor == 0:
-                    y = int((section_size[1] - im2_size[1]) / 2)
-                else:
-                    y = im2_cursor + int((section_size[1] - im2_size[1]) / 2)
+        Module runs and exports which have not started yet are cancelled, idle threads end
+        right away. Modules which are still running, e.g. hung past their deadline, are
+        abandoned: their results are ignored. As threads can not be stopped, Python still
+        waits for them to return when it exits. New pools are set up, so Inkycal can run again.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._exporter.shutdown(wait=False, cancel_futures=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.module_workers, thread_name_prefix="inkycal_module")
+        self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inkycal_export")
+        self._running = {}
+        self._exports = []
 
-                # center the image in the section space
-                im_colour.paste(im2, (x, y), im2)
+    def _export(self, images: dict) -> None:
+        """Saves images as PNG files in the image folder in the background.
 
-                # Shift the y-axis cursor at the beginning of next section
-                im2_cursor += section_size[1]
+        Args:
+            images (dict): Mapping of filename -> image. Images must not be modified afterwards.
+                A callable returning the image can be used instead to generate the image in the background.
+        """
+        if not self.export_images:
+            return
+        self._exports = [future for future in self._exports if not future.done()]
+        self._exports.append(self._exporter.submit(self._save_images, images))
 
-        # Add info-section if specified --
+    @staticmethod
+    def _save_images(images: dict) -> None:
+        """Saves the given images (filename -> image) in the image folder"""
+        for filename, image in images.items():
+            try:
+                if callable(image):
+                    image = image()
+                image.save(os.path.join(settings.IMAGE_FOLDER, filename), "PNG")
+            except Exception:
+                logger.exception(f"Could not save {filename} in the image folder")
+
+    def _wait_for_exports(self) -> None:
+        """Blocks until all pending images have been saved to the image folder"""
+        for future in self._exports:
+            future.result()
+        self._exports = []
 
-        # Calculate the max. fontsize for info-section
-        if self.settings['info_section']:
-            info_height = self.settings["info_section_height"]
-            info_width = width
-            font = self.font = ImageFont.truetype(
-                fonts['NotoSansUI-Regular'], size=14)
+    @staticmethod
+    def _plan_layout(settings: dict) -> tuple:
+        """Computes the layout of the canvas from the settings, without changing any state.
 
-            info_x = im_black.size[1] - info_height
-            write(im_black, (0, info_x), (info_width, info_height),
-                  self.info, font=font)
+        The 'layout' in the settings file arranges the sections of the modules (sorted by position):
+          - stacked (default): on top of each other
+          - columns: next to each other
+          - grid: next to each other, continuing in the next row when the canvas is full
 
-        # optimize the image by mapping colours to pure black and white
-        if self.optimize:
-            im_black = self._optimize_im(im_black)
-            im_colour = self._optimize_im(im_colour)
+        Returns:
+            tuple: the size of the canvas, the box (x, y, width, height) of the section of each
+            module, the box of the info section (None without it) and whether sections overlap.
 
-        im_black.save(os.path.join(settings.IMAGE_FOLDER, "canvas.png"), "PNG")
-        im_colour.save(os.path.join(settings.IMAGE_FOLDER, "canvas_colour.png"), 'PNG')
+        Raises:
+            ValueError: If the layout is not known.
+            KeyError: If the settings lack an option the layout needs.
+        """
+        # Since Inkycal runs in vertical mode, switch the height and width
+        height, width = Display.get_display_size(settings["model"])
+
+        layout = settings.get('layout', 'stacked')
+        if layout not in ('stacked', 'columns', 'grid'):
+            raise ValueError(f"Unknown layout '{layout}', use 'stacked', 'columns' or 'grid'")
+
+        # Box (x, y, width, height) of the section of each module
+        boxes = {}
+        x = y = row_height = 0
+        for module in sorted(settings['modules'], key=lambda module: module['position']):
+            section_width, section_height = module['config']['size']
+            if layout == 'grid' and x and x + section_width > width:
+                x, y, row_height = 0, y + row_height, 0
+
+            boxes[module['position']] = (x, y, section_width, section_height)
+            if x + section_width > width or y + section_height > height:
+                logger.warning(f"Module {module['position']} does not fit on the display")
+
+            if layout == 'stacked':
+                y += section_height
+            else:
+                x += section_width
+                row_height = max(row_height, section_height)
+
+        # The info section is placed at the bottom of the canvas
+        info_box = None
+        if settings['info_section']:
+            info_height = settings["info_section_height"]
+            info_box = (0, height - info_height, width, info_height)
+
+        # Overlapping sections (including the info section) can not be drawn independently
+        sections = list(boxes.values()) + ([info_box] if info_box else [])
+        overlap = any(
+            a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+            for i, a in enumerate(sections) for b in sections[i + 1:]
+        )
+        return (width, height), boxes, info_box, overlap
+
+    def _compile_layout(self) -> None:
+        """Computes where the modules and the info section are placed on the canvas.
+
+        Runs once at startup, so assembling the canvas in each cycle is only a sequence of pastes.
+        See _plan_layout for the layouts.
+
+        Raises:
+            ValueError: If the layout is not known.
+        """
+        self._canvas_size, self._layout, self._info_box, self._sections_overlap = self._plan_layout(self.settings)
+        if self._info_box:
+            self.font = ImageFont.truetype(fonts['NotoSansUI-Regular'], size=14)
 
-        # Additionally, combine the two images with color
-        def clear_white(img):
-            """Replace all white pixels from image with transparent pixels
-            """
-            x = numpy.asarray(img.convert('RGBA')).copy()
-            x[:, :, 3] = (255 * (x[:, :, :3] != 255).any(axis=2)).astype(numpy.uint8)
-            return Image.fromarray(x)
+        # Canvases are reused in each cycle, one pair per mode, with the digests of the drawn
+        # module images (and the info text) for each mode. The last assembled frame is reused
+        # if nothing changed.
+        self._canvases = {}
+        self._drawn = {}
+        self._last_frame = None
+        self._frame_changed = True
 
-        # Additionally, combine the two images with color
-        def black_to_colour(img):
-            """Replace all black pixels from image with red pixels
-            """
-            buffer = numpy.array(img.convert('RGB'))
-            red, green = buffer[:, :, 0], buffer[:, :, 1]
+    def _assemble(self) -> (Image, Image):
+        """Assembles all sub-images to a single image
 
-            threshold = 220
+        Returns:
+            The assembled black and colour canvas.
+        """
+        # Work with greyscale planes if all modules created greyscale images ('1', 'L' or 'P').
+        # Images of modules creating RGB images need an RGB canvas.
+        images = [image for number in self.modules for image in self._module_images.get(number, ()) if image]
+        mode = 'L' if all(self._is_greyscale(image) for image in images) else 'RGB'
+
+        if mode not in self._canvases:
+            self._canvases[mode] = tuple(Image.new(mode, self._canvas_size, color='white') for _ in range(2))
+        canvases = self._canvases[mode]
+        im_black, im_colour = canvases
+
+        # Only sections whose module image changed since they were drawn on this canvas are drawn again
+        drawn = self._drawn.setdefault(mode, {})
+        digests = {number: self._module_digests.get(number) for number in self._layout}
+        info = self.info if self._info_box else None
+        changed = [number for number in self._layout if number not in drawn or drawn[number] != digests[number]]
+        info_changed = drawn.get('info', False) != info
+
+        self._frame_changed = bool(changed or info_changed) or self._last_frame is None or self._last_frame[0] != mode
+        if not self._frame_changed:
+            return self._last_frame[1:]
+
+        # Sections overlap or images are larger than their section, everything has to be drawn again
+        if self._sections_overlap or drawn and any(self._exceeds_section(number) for number in changed):
+            drawn.clear()
+        if not drawn:
+            for canvas in canvases:
+                canvas.paste('white', (0, 0, *self._canvas_size))
+            changed, info_changed = list(self._layout), True
+
+        # center the image of each module in its section
+        for number in changed:
+            x, y, section_width, section_height = self._layout[number]
+            for canvas, image in zip(canvases, self._module_images.get(number, (None, None))):
+                canvas.paste('white', (x, y, x + section_width, y + section_height))
+                if image is not None:
+                    self._paste(canvas, image, (x + int((section_width - image.width) / 2),
+                                                y + int((section_height - image.height) / 2)))
+            drawn[number] = digests[number]
+        self.metrics.set("sections_drawn", len(changed))
+
+        # Add info-section if specified
+        if self._info_box and info_changed:
+            x, y, info_width, info_height = self._info_box
+            im_black.paste('white', (x, y, x + info_width, y + info_height))
+            write(im_black, (x, y), (info_width, info_height), self.info, font=self.font)
+        drawn['info'] = info
+
+        # Optimize both bands and create the full-screen preview in a single pass
+        preview = self.export_images and self.full_screen_preview
+        with self.metrics.timer("optimize"):
+            im_black, im_colour, im_preview = self._post_process(im_black, im_colour, preview=preview)
+
+        # The canvases are reused in the next cycle, only hand out copies
+        if not self.optimize:
+            im_black, im_colour = im_black.copy(), im_colour.copy()
+
+        self._last_frame = (mode, im_black, im_colour)
+
+        # Save the canvas and the full-screen preview in the background
+        images = {"canvas.png": im_black, "canvas_colour.png": im_colour}
+        if im_preview is not None:
+            images["full-screen.png"] = im_preview
+        self._export(images)
+
+        return im_black, im_colour
+
+    def _exceeds_section(self, number) -> bool:
+        """Checks if an image of a module is larger than its section, i.e. covers other sections"""
+        _, _, section_width, section_height = self._layout[number]
+        return any(image is not None and (image.width > section_width or image.height > section_height)
+                   for image in self._module_images.get(number, ()))
 
-            # non-white -> red
-            buffer[numpy.logical_and(red <= threshold, green <= threshold)] = [255, 0, 0]
+    @staticmethod
+    def _is_greyscale(image: Image) -> bool:
+        """Checks if an image can be handled as greyscale plane without changing how it looks"""
+        if image.mode in ('1', 'L'):
+            return True
+        if image.mode == 'P' and 'transparency' not in image.info:
+            # only the colours used in the image have to be grey
+            palette = numpy.array(image.getpalette('RGB'), dtype=numpy.uint8).reshape(-1, 3)
+            used = palette[[index for _, index in image.getcolors(256)]]
+            return bool((used == used[:, :1]).all())
+        return False
 
-            return Image.fromarray(buffer)
+    @staticmethod
+    def _paste(canvas: Image, image: Image, xy: (int, int)) -> None:
+        """Pastes the image of a module on the canvas.
 
-        # Save full-screen images as well
-        im_black = clear_white(im_black)
-        im_colour = black_to_colour(im_colour)
+        Greyscale images are pasted as they are on greyscale canvases. Others are converted
+        to RGBA and pasted with their transparency.
+        """
+        if canvas.mode == 'L':
+            canvas.paste(image.convert('L'), xy)
+        else:
+            image = image.convert('RGBA')
+            canvas.paste(image, xy, image)
 
-        im_colour.paste(im_black, (0, 0), im_black)
-        im_colour.save(os.path.join(settings.IMAGE_FOLDER, 'full-screen.png'), 'PNG')
+    def _post_process(self, im_black: Image, im_colour: Image, preview: bool = True,
+                      threshold: int = BitmapStore.threshold) -> (Image, Image, Image or None):
+        """Optimizes the black and colour canvas and creates the full-screen preview.
 
-    @staticmethod
-    def _optimize_im(image, threshold=220):
-        """Optimize the image for rendering on ePaper displays"""
+        Dark pixels (red and green <= threshold) are mapped to pure black if optimize is enabled.
+        The preview shows everything non-white of the black band in black, the dark pixels of the
+        colour band in red.
 
-        buffer = numpy.array(image.convert('RGB'))
-        red, green = buffer[:, :, 0], buffer[:, :, 1]
+        Everything is computed in one pass on the separate colour planes with bitwise masks
+        (255 = keep, 0 = drop), which is much faster than indexing interleaved RGB arrays.
+        The mask and preview buffers are reused as long as the canvas size does not change.
 
-        # grey->black
-        buffer[numpy.logical_and(red <= threshold, green <= threshold)] = [0, 0, 0]
-        image = Image.fromarray(buffer)
-        return image
+        Returns:
+            The optimized black and colour canvas and the preview (None if preview is False).
+        """
+        greyscale = im_black.mode == im_colour.mode == 'L'
+        if greyscale:
+            # A greyscale plane is handled like an RGB image with three equal planes
+            black, colour = [numpy.array(im_black)] * 3, [numpy.array(im_colour)] * 3
+        else:
+            black = [numpy.array(plane) for plane in im_black.convert('RGB').split()]
+            colour = [numpy.array(plane) for plane in im_colour.convert('RGB').split()]
+
+        shape = black[0].shape
+        if self._buffers is None or self._buffers[0].shape != shape:
+            self._buffers = [numpy.empty(shape, dtype=numpy.uint8) for _ in range(6)]
+        black_keep, colour_keep, cover, *preview_planes = self._buffers
+
+        for (red, green, blue), keep in ((black, black_keep), (colour, colour_keep)):
+            # 255 if the pixel is bright, i.e. max(red, green) > threshold, else 0
+            numpy.maximum(red, green, out=keep)
+            numpy.negative(numpy.greater(keep, threshold).view(numpy.uint8), out=keep)
+            if self.optimize:
+                # grey->black
+                for plane in (red,) if greyscale else (red, green, blue):
+                    plane &= keep
+
+        im_preview = None
+        if preview:
+            # non-white pixels of the black band cover the colour band
+            numpy.minimum(black[0], black[1], out=cover)
+            numpy.minimum(cover, black[2], out=cover)
+            numpy.negative(numpy.not_equal(cover, 255).view(numpy.uint8), out=cover)
+
+            # dark pixels of the colour band are red (255, 0, 0)
+            out_red, out_green, out_blue = preview_planes
+            numpy.bitwise_or(colour[0], numpy.invert(colour_keep, out=out_red), out=out_red)
+            numpy.bitwise_and(colour[1], colour_keep, out=out_green)
+            numpy.bitwise_and(colour[2], colour_keep, out=out_blue)
+
+            for plane, black_plane in zip(preview_planes, black):
+                # plane = black_plane where covered, else plane
+                numpy.bitwise_xor(plane, black_plane, out=black_keep)
+                black_keep &= cover
+                plane ^= black_keep
+            im_preview = Image.merge('RGB', [Image.fromarray(plane) for plane in preview_planes])
+
+        if self.optimize and greyscale:
+            im_black, im_colour = Image.fromarray(black[0]), Image.fromarray(colour[0])
+        elif self.optimize:
+            im_black = Image.merge('RGB', [Image.fromarray(plane) for plane in black])
+            im_colour = Image.merge('RGB', [Image.fromarray(plane) for plane in colour])
+        return im_black, im_colour, im_preview
 
     def calibrate(self, cycles=3):
         """Calibrate the E-Paper display
@@ -617,20 +1097,149 @@ class Inkycal:
                 logger.error(f"could not remove file: {_file}")
                 pass
 
+    async def _process_modules(self) -> (list, list):
+        """Generates the images of all modules concurrently.
+
+        Every module runs in a worker thread of the module pool, so the duration of a
+        cycle is bounded by the slowest module instead of the sum of all modules.
+        Failures are isolated, a failing module does not affect the other ones.
+
+        Each module has to finish within its deadline. If it does not, the cycle continues
+        with the last image of that module, which is marked as stale.
+
+        Returns:
+            tuple: The numbers of the modules which could not generate an image and the
+            numbers of the modules which missed their deadline and use their last image.
+        """
+        self._process_pool.next_cycle()
+        numbers = sorted(self.modules)
+        previous = {number: self._module_digests.get(number) for number in numbers}
+        results = await asyncio.gather(*[self._run_module(number) for number in numbers], return_exceptions=True)
+
+        failed, stale = [], []
+        for number, success in zip(numbers, results):
+            if success is True:
+                # Only export and store images which changed in this cycle
+                if self._module_digests.get(number) != previous[number]:
+                    black, colour = self._module_images[number]
+                    self._export({f"module{number}_black.png": black, f"module{number}_colour.png": colour})
+                    self._store_bitmap(number, black, colour)
+            elif success is None and number in self._module_images:
+                stale.append(number)
+            else:
+                failed.append(number)
+
+        self.metrics.set("overruns", sum(1 for success in results if success is None))
+        return failed, stale
+
+    async def _run_module(self, number) -> bool or None:
+        """Runs process_module in the module pool and waits until the module's deadline.
+
+        A module which misses its deadline keeps running in the background, as threads cannot
+        be stopped. It is not started again until it finished, but its image is used once it did.
+
+        Returns:
+            True if the image was generated, False if the module failed, None if it missed its deadline.
+        """
+        future = self._running.get(number)
+        if future is None or future.done():
+            future = self._running[number] = self._executor.submit(self.process_module, number)
+
+        deadline = getattr(self.modules[number], 'deadline', None) or self.module_deadline
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f"Module {number} did not finish within its deadline of {deadline}s, using its last image")
+            self.metrics.record(f"module_{number}_overrun", time.perf_counter() - start)
+            return None
+
+    def _module_config(self, number) -> dict:
+        """Returns the entry of a module in the settings file"""
+        return [i for i in self.settings['modules'] if i['position'] == number][0]
+
+    def _load_bitmaps(self, numbers: list or None = None) -> None:
+        """Loads the last good images of the given (default: all) modules from the bitmap store"""
+        for number in self.modules if numbers is None else numbers:
+            if number not in self.modules:
+                continue
+            stored = self.bitmap_store.load(number, self._module_config(number))
+            if stored is not None:
+                self._module_images[number] = (stored["black"], stored["colour"])
+                self._module_digests[number] = self._image_digest(stored["black"], stored["colour"])
+                logger.info(f"Loaded last image of module {number} from "
+                            f"{arrow.get(stored['timestamp']).to('local').format('YYYY-MM-DD HH:mm')}")
+
+    def _store_bitmap(self, number, black, colour) -> None:
+        """Saves the images of a module in the bitmap store in the background"""
+        data_hash = getattr(self.modules.get(number), 'data_digest', None)
+
+        def save():
+            try:
+                self.bitmap_store.save(number, self._module_config(number), black, colour, data_hash)
+            except Exception:
+                logger.exception(f"Could not store the image of module {number}")
+
+        self._exports = [future for future in self._exports if not future.done()]
+        self._exports.append(self._exporter.submit(save))
+
     def process_module(self, number) -> bool or Exception:
         """Process individual module to generate images and handle exceptions."""
-        module = eval(f'self.module_{number}')
+        module = self.modules[number]
+        if self._is_fresh(number, module):
+            logger.debug(f"Reusing image of module {number}, refresh interval has not expired yet")
+            return True
         try:
-            black, colour = module.generate_image()
+            if getattr(module, 'thread_safe', True):
+                with self._measure_memory(number), self.metrics.timer(f"module_{number}"):
+                    black, colour = module.generate_image()
+            else:
+                with self._serial_lock, self._measure_memory(number), self.metrics.timer(f"module_{number}"):
+                    black, colour = module.generate_image()
+            # modules using fetch and render also report the time of each step
+            for step, seconds in getattr(module, 'timings', {}).items():
+                self.metrics.record(f"module_{number}_{step}", seconds)
             if self.show_border:
                 draw_border_2(im=black, xy=(1, 1), size=(black.width - 2, black.height - 2), radius=5)
-            black.save(os.path.join(settings.IMAGE_FOLDER, f"module{number}_black.png"), "PNG")
-            colour.save(os.path.join(settings.IMAGE_FOLDER, f"module{number}_colour.png"), "PNG")
+            if self.modules.get(number) is not module:
+                logger.debug(f"Module {number} was replaced while generating its image, discarding it")
+                return False
+            self._module_images[number] = (black, colour)
+            self._module_digests[number] = self._image_digest(black, colour)
+            self._module_updates[number] = time.monotonic()
             return True
         except Exception:
             logger.exception(f"Error in module {number}!")
             return False
 
+    def _measure_memory(self, number):
+        """Records the memory used by a module if memory profiling is enabled"""
+        if self.memory_profiler is None:
+            return nullcontext()
+        return self.memory_profiler.measure(f"module_{number}")
+
+    def _handle_report_signal(self) -> None:
+        """Writes a memory report in the background when receiving SIGUSR1"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(
+                signal.SIGUSR1, lambda: loop.run_in_executor(None, self.memory_profiler.write_report)
+            )
+        except (NotImplementedError, AttributeError, RuntimeError, ValueError):
+            logger.warning("Memory reports on SIGUSR1 are not supported on this platform")
+
+    def _is_fresh(self, number, module) -> bool:
+        """Checks if the last image of a module can be reused as its refresh interval has not expired yet."""
+        refresh_interval = getattr(module, 'refresh_interval', None)
+        last_update = self._module_updates.get(number)
+        if not refresh_interval or last_update is None or number not in self._module_images:
+            return False
+
+        # Updates are aligned to the update interval, allow half an interval of tolerance
+        # so the module is not skipped for a whole cycle when the update runs a bit early
+        tolerance = self.settings['update_interval'] * 30
+        return time.monotonic() - last_update < refresh_interval * 60 - tolerance
+
     def _shutdown_system(self):
         """Shutdown the system"""
         import subprocess
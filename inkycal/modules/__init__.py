@@ -1,15 +1,57 @@
-from .inkycal_agenda import Agenda
-from .inkycal_calendar import Calendar
-from .inkycal_weather import Weather
-from .inkycal_feeds import Feeds
-from .inkycal_todoist import Todoist
-from .inkycal_image import Inkyimage
-from .inkycal_jokes import Jokes
-from .inkycal_stocks import Stocks
-from .inkycal_slideshow import Slideshow
-from .inkycal_textfile_to_display import TextToDisplay
-from .inkycal_webshot import Webshot
-from .inkycal_xkcd import Xkcd
-from .inkycal_fullweather import Fullweather
-from .inkycal_tindie import Tindie
-from .custom_pihole import PiHole
+"""Registry of Inkycal modules
+
+Modules are only imported when they are used for the first time, e.g. through
+load_module('Stocks') or `from inkycal.modules import Stocks`. This way, heavy
+dependencies like matplotlib or yfinance are only imported if a module requiring
+them is actually used.
+"""
+from importlib import import_module
+
+# Maps the name of each module (as used in settings.json) to the python module defining it
+registry = {
+    "Agenda": "inkycal.modules.inkycal_agenda",
+    "Calendar": "inkycal.modules.inkycal_calendar",
+    "Weather": "inkycal.modules.inkycal_weather",
+    "Feeds": "inkycal.modules.inkycal_feeds",
+    "Todoist": "inkycal.modules.inkycal_todoist",
+    "Inkyimage": "inkycal.modules.inkycal_image",
+    "Jokes": "inkycal.modules.inkycal_jokes",
+    "Stocks": "inkycal.modules.inkycal_stocks",
+    "Slideshow": "inkycal.modules.inkycal_slideshow",
+    "TextToDisplay": "inkycal.modules.inkycal_textfile_to_display",
+    "Webshot": "inkycal.modules.inkycal_webshot",
+    "Xkcd": "inkycal.modules.inkycal_xkcd",
+    "Fullweather": "inkycal.modules.inkycal_fullweather",
+    "Tindie": "inkycal.modules.inkycal_tindie",
+    "PiHole": "inkycal.modules.custom_pihole",
+}
+
+__all__ = list(registry)
+
+
+def register_module(name: str, path: str) -> None:
+    """Registers a (third-party) module, so it can be used in settings.json.
+
+    Args:
+        name (str): The name of the module class, e.g. 'MyModule'.
+        path (str): The python module defining the class, e.g. 'my_package.my_module'.
+    """
+    registry[name] = path
+
+
+def load_module(name: str) -> type:
+    """Imports a module by its name and returns its class.
+
+    Raises:
+        ImportError: If no module with this name is registered.
+    """
+    if name not in registry:
+        raise ImportError(f"No module named {name} is registered")
+    return getattr(import_module(registry[name]), name)
+
+
+def __getattr__(name: str):
+    # Lazy import of modules, e.g. `from inkycal.modules import Agenda`
+    if name in registry:
+        return load_module(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
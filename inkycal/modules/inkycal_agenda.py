@@ -17,6 +17,9 @@ class Agenda(inkycal_module):
 
     name = "Agenda - Display upcoming events from given iCalendars"
 
+    # Only draws black and white, see inkycal_module.image_mode
+    image_mode = "L"
+
     requires = {
         "ical_urls": {
             "label": "iCalendar URL/s, separate multiple ones with a comma",
@@ -80,8 +83,36 @@ class Agenda(inkycal_module):
         # give an OK message
         logger.debug(f'{__name__} loaded')
 
-    def generate_image(self):
-        """Generate image for this module"""
+    def fetch(self):
+        """Fetches the events of the days shown in the agenda"""
+
+        # One line is needed per day at least
+        im_height = int(self.height - (2 * self.padding_top))
+        max_lines = im_height // (self.font.getbbox("hg")[3] + 1)
+
+        today = arrow.now().floor('day')
+
+        # Load icalendar from config
+        self.ical = iCalendar()
+        parser = self.ical
+
+        if self.ical_urls:
+            parser.load_url(self.ical_urls)
+
+        if self.ical_files:
+            parser.load_from_file(self.ical_files)
+
+        # Load events from all icalendar in timerange
+        upcoming_events = parser.get_events(today, today.shift(days=max_lines - 1), self.timezone)
+
+        # Sort events by beginning time
+        parser.sort()
+        # parser.show_events()
+
+        return {"today": today, "events": upcoming_events}
+
+    def render(self, data):
+        """Render the agenda on the images for this module"""
 
         # Define new image size with respect to padding
         im_width = int(self.width - (2 * self.padding_left))
@@ -91,8 +122,8 @@ class Agenda(inkycal_module):
         logger.debug(f'Image size: {im_size}')
 
         # Create an image for black pixels and one for coloured pixels
-        im_black = Image.new('RGB', size=im_size, color='white')
-        im_colour = Image.new('RGB', size=im_size, color='white')
+        im_black = self.new_image(im_size)
+        im_colour = self.new_image(im_size)
 
         # Calculate the max number of lines that can fit on the image
         line_spacing = 1
@@ -104,8 +135,7 @@ class Agenda(inkycal_module):
         logger.debug(f'max lines: {max_lines}')
 
         # Create timeline for agenda
-        now = arrow.now()
-        today = now.floor('day')
+        today = data["today"]
 
         # Create a list of dates for the next days
         agenda_events = [
@@ -116,23 +146,7 @@ class Agenda(inkycal_module):
             }
             for _ in range(max_lines)]
 
-        # Load icalendar from config
-        self.ical = iCalendar()
-        parser = self.ical
-
-        if self.ical_urls:
-            parser.load_url(self.ical_urls)
-
-        if self.ical_files:
-            parser.load_from_file(self.ical_files)
-
-        # Load events from all icalendar in timerange
-        upcoming_events = parser.get_events(today, agenda_events[-1]['begin'],
-                                            self.timezone)
-
-        # Sort events by beginning time
-        parser.sort()
-        # parser.show_events()
+        upcoming_events = data["events"]
 
         # Set the width for date, time and event titles
         date_width = int(max([self.font.getlength(
@@ -199,7 +213,7 @@ class Agenda(inkycal_module):
                     time = _['begin'].format(self.time_format, locale=self.language)
 
                     # Check if event is all day, if not, add the time
-                    if not parser.all_day(_):
+                    if not iCalendar.all_day(_):
                         write(im_black, (x_time, line_pos[cursor][1]),
                               (time_width, line_height), time,
                               font=self.font, alignment='right')
@@ -8,6 +8,7 @@ Copyright by aceinnolab
 import calendar as cal
 
 from inkycal.custom import *
+from inkycal.modules.ical_parser import iCalendar
 from inkycal.modules.template import inkycal_module
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,9 @@ class Calendar(inkycal_module):
 
     name = "Calendar - Show monthly calendar with events from iCalendars"
 
+    # Only draws black and white, see inkycal_module.image_mode
+    image_mode = "L"
+
     optional = {
         "week_starts_on": {
             "label": "When does your week start? (default=Monday)",
@@ -91,8 +95,65 @@ class Calendar(inkycal_module):
         """Flatten the values."""
         return [x for y in values for x in y]
 
-    def generate_image(self):
-        """Generate image for this module"""
+    def fetch(self):
+        """Fetches the days of this month with events and the upcoming events"""
+
+        now = arrow.now(tz=self.timezone)
+        data = {"today": now.floor('day'), "days_with_events": [], "upcoming_events": []}
+
+        if not self.show_events:
+            return data
+
+        # timeline for filtering events within this month
+        month_start = arrow.get(now.floor('month'))
+        month_end = arrow.get(now.ceil('month'))
+
+        # fetch events from given iCalendars
+        self.ical = iCalendar()
+        parser = self.ical
+
+        if self.ical_urls:
+            parser.load_url(self.ical_urls)
+        if self.ical_files:
+            parser.load_from_file(self.ical_files)
+
+        # Filter events for full month (even past ones) for drawing event icons
+        month_events = parser.get_events(month_start, month_end, self.timezone)
+        parser.sort()
+        self.month_events = month_events
+
+        # Initialize days_with_events as an empty list
+        days_with_events = []
+
+        # Handle multi-day events by adding all days between start and end
+        for event in month_events:
+
+            # Convert start and end dates to arrow objects with timezone
+            start = arrow.get(event['begin'].date(), tzinfo=self.timezone)
+            end = arrow.get(event['end'].date(), tzinfo=self.timezone)
+
+            # Use arrow's range function for generating dates
+            for day in arrow.Arrow.range('day', start, end):
+                day_num = int(day.format('D'))  # get day number using arrow's format method
+                if day_num not in days_with_events:
+                    days_with_events.append(day_num)
+
+        # remove duplicates (more than one event in a single day)
+        days_with_events = sorted(set(days_with_events))
+        self._days_with_events = days_with_events
+
+        # Filter upcoming events until 4 weeks in the future
+        parser.clear_events()
+        upcoming_events = parser.get_events(now, now.shift(weeks=4), self.timezone)
+        self._upcoming_events = upcoming_events
+
+        data["days_with_events"] = days_with_events
+        # events which already ended still count towards the lines available, but are not drawn
+        data["upcoming_events"] = [dict(event, ended=not now < event['end']) for event in upcoming_events]
+        return data
+
+    def render(self, data):
+        """Render the calendar and the given events on the images for this module"""
 
         # Define new image size with respect to padding
         im_width = int(self.width - (2 * self.padding_left))
@@ -103,8 +164,8 @@ class Calendar(inkycal_module):
         logger.debug(f'Image size: {im_size}')
 
         # Create an image for black pixels and one for coloured pixels
-        im_black = Image.new('RGB', size=im_size, color='white')
-        im_colour = Image.new('RGB', size=im_size, color='white')
+        im_black = self.new_image(im_size)
+        im_colour = self.new_image(im_size)
 
         # Allocate space for month-names, weekdays etc.
         month_name_height = int(im_height * 0.10)
@@ -154,7 +215,7 @@ class Calendar(inkycal_module):
             for _ in range(calendar_cols)
         ]
 
-        now = arrow.now(tz=self.timezone)
+        now = data["today"]
 
         # Set week-start of calendar to specified week-start
         if self.week_start == "Monday":
@@ -258,10 +319,6 @@ class Calendar(inkycal_module):
             elif len(cal.monthcalendar(now.year, now.month)) == 4:
                 events_height += icon_height * 2
 
-            # import the ical-parser
-            # pylint: disable=import-outside-toplevel
-            from inkycal.modules.ical_parser import iCalendar
-
             # find out how many lines can fit at max in the event section
             line_spacing = 2
             text_bbox_height = self.font.getbbox("hg")
@@ -275,48 +332,8 @@ class Calendar(inkycal_module):
                 for _ in range(max_event_lines)
             ]
 
-            # logger.debug(f"event_lines {event_lines}")
-
-            # timeline for filtering events within this month
-            month_start = arrow.get(now.floor('month'))
-            month_end = arrow.get(now.ceil('month'))
-
-            # fetch events from given iCalendars
-            self.ical = iCalendar()
-            parser = self.ical
-
-            if self.ical_urls:
-                parser.load_url(self.ical_urls)
-            if self.ical_files:
-                parser.load_from_file(self.ical_files)
-
-            # Filter events for full month (even past ones) for drawing event icons
-            month_events = parser.get_events(month_start, month_end, self.timezone)
-            parser.sort()
-            self.month_events = month_events
-
-            # Initialize days_with_events as an empty list
-            days_with_events = []
-
-            # Handle multi-day events by adding all days between start and end
-            for event in month_events:
-
-                # Convert start and end dates to arrow objects with timezone
-                start = arrow.get(event['begin'].date(), tzinfo=self.timezone)
-                end = arrow.get(event['end'].date(), tzinfo=self.timezone)
-
-                # Use arrow's range function for generating dates
-                for day in arrow.Arrow.range('day', start, end):
-                    day_num = int(day.format('D'))  # get day number using arrow's format method
-                    if day_num not in days_with_events:
-                        days_with_events.append(day_num)
-
-            # remove duplicates (more than one event in a single day)
-            days_with_events = sorted(set(days_with_events))
-            self._days_with_events = days_with_events
-
             # Draw a border with specified parameters around days with events
-            for days in days_with_events:
+            for days in data["days_with_events"]:
                 if days in grid:
                     draw_border(
                         im_colour,
@@ -325,10 +342,7 @@ class Calendar(inkycal_module):
                         radius=6
                     )
 
-            # Filter upcoming events until 4 weeks in the future
-            parser.clear_events()
-            upcoming_events = parser.get_events(now, now.shift(weeks=4), self.timezone)
-            self._upcoming_events = upcoming_events
+            upcoming_events = data["upcoming_events"]
 
             # delete events which won't be able to fit (more events than lines)
             upcoming_events = upcoming_events[:max_event_lines]
@@ -374,7 +388,7 @@ class Calendar(inkycal_module):
                         the_time = event['begin'].format(self.time_format, locale=lang)
                         # logger.debug(f"name:{the_name}   date:{the_date} time:{the_time}")
 
-                        if now < event['end']:
+                        if not event['ended']:
                             write(
                                 im_colour,
                                 event_lines[cursor],
@@ -385,7 +399,7 @@ class Calendar(inkycal_module):
                             )
 
                             # Check if event is all day
-                            if parser.all_day(event):
+                            if iCalendar.all_day(event):
                                 write(
                                     im_black,
                                     (date_width, event_lines[cursor][1]),
@@ -21,6 +21,9 @@ class Feeds(inkycal_module):
 
     name = "RSS / Atom - Display feeds from given RSS/ATOM feeds"
 
+    # Only draws black and white, see inkycal_module.image_mode
+    image_mode = "L"
+
     requires = {
         "feed_urls": {
             "label": "Please enter ATOM or RSS feed URL/s, separated by a comma",
@@ -68,18 +71,8 @@ class Feeds(inkycal_module):
         if not isinstance(self.shuffle_feeds, bool):
             print('shuffle_feeds has to be a boolean: True/False')
 
-    def generate_image(self):
-        """Generate image for this module"""
-
-        # Define new image size with respect to padding
-        im_width = int(self.width - (2 * self.padding_left))
-        im_height = int(self.height - (2 * self.padding_top))
-        im_size = im_width, im_height
-        logger.debug(f'Image size: {im_size}')
-
-        # Create an image for black pixels and one for coloured pixels
-        im_black = Image.new('RGB', size=im_size, color='white')
-        im_colour = Image.new('RGB', size=im_size, color='white')
+    def fetch(self):
+        """Fetches the posts of all feeds"""
 
         # Check if internet is available
         if internet_available():
@@ -88,21 +81,6 @@ class Feeds(inkycal_module):
             logger.error("Network not reachable. Please check your connection.")
             raise NetworkNotReachableError
 
-        # Set some parameters for formatting feeds
-        line_spacing = 1
-
-        line_width = im_width
-        text_bbox_height = self.font.getbbox("hg")
-        line_height = text_bbox_height[3] + line_spacing
-        max_lines = (im_height // (line_height + line_spacing))
-
-        # Calculate padding from top so the lines look centralised
-        spacing_top = int(im_height % line_height / 2)
-
-        # Calculate line_positions
-        line_positions = [
-            (0, spacing_top + _ * line_height) for _ in range(max_lines)]
-
         # Create list containing all feeds from all urls
         parsed_feeds = []
         for feeds in self.feed_urls:
@@ -121,6 +99,36 @@ class Feeds(inkycal_module):
         if self.shuffle_feeds:
             shuffle(parsed_feeds)
 
+        return parsed_feeds
+
+    def render(self, parsed_feeds):
+        """Render the posts on the images for this module"""
+
+        # Define new image size with respect to padding
+        im_width = int(self.width - (2 * self.padding_left))
+        im_height = int(self.height - (2 * self.padding_top))
+        im_size = im_width, im_height
+        logger.debug(f'Image size: {im_size}')
+
+        # Create an image for black pixels and one for coloured pixels
+        im_black = self.new_image(im_size)
+        im_colour = self.new_image(im_size)
+
+        # Set some parameters for formatting feeds
+        line_spacing = 1
+
+        line_width = im_width
+        text_bbox_height = self.font.getbbox("hg")
+        line_height = text_bbox_height[3] + line_spacing
+        max_lines = (im_height // (line_height + line_spacing))
+
+        # Calculate padding from top so the lines look centralised
+        spacing_top = int(im_height % line_height / 2)
+
+        # Calculate line_positions
+        line_positions = [
+            (0, spacing_top + _ * line_height) for _ in range(max_lines)]
+
         # Trim down the list to the max number of lines
         del parsed_feeds[max_lines:]
 
@@ -74,6 +74,9 @@ class Fullweather(inkycal_module):
 
     name = "Fullscreen weather (openweathermap) - Get weather forecasts from openweathermap"
 
+    # matplotlib's pyplot is not thread-safe
+    thread_safe = False
+
     requires = {
         "api_key": {
             "label": "Please enter openweathermap api-key. You can create one for free on openweathermap",
@@ -49,6 +49,10 @@ class Inkyimage(inkycal_module):
         if "dither" in config and config["dither"] == False:
             self.dither = False
 
+        # A local image rarely changes, reload it once a day unless configured otherwise
+        if not self.path.startswith("http") and "refresh_interval" not in config:
+            self.refresh_interval = 24 * 60
+
         # give an OK message
         logger.debug(f"{__name__} loaded")
 
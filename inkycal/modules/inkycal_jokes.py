@@ -22,6 +22,9 @@ class Jokes(inkycal_module):
 
     name = "iCanHazDad API - grab a random joke from icanhazdad api"
 
+    # Only draws black and white, see inkycal_module.image_mode
+    image_mode = "L"
+
     def __init__(self, config):
         """Initialize inkycal_feeds module"""
 
@@ -32,8 +35,27 @@ class Jokes(inkycal_module):
         # give an OK message
         logger.debug(f'{__name__} loaded')
 
-    def generate_image(self):
-        """Generate image for this module"""
+    def fetch(self):
+        """Fetches a random joke"""
+
+        # Check if internet is available
+        if internet_available():
+            logger.debug('Connection test passed')
+        else:
+            logger.error("Network not reachable. Please check your connection.")
+            raise NetworkNotReachableError
+
+        # Get the actual joke
+        url = "https://icanhazdadjoke.com"
+        header = {"accept": "text/plain"}
+        response = requests.get(url, headers=header)
+        response.encoding = 'utf-8'  # Change encoding to UTF-8
+        joke = response.text.rstrip()  # use to remove newlines
+        logger.debug(f"joke: {joke}")
+        return joke
+
+    def render(self, joke):
+        """Render the joke on the images for this module"""
 
         # Define new image size with respect to padding
         im_width = int(self.width - (2 * self.padding_left))
@@ -42,15 +64,8 @@ class Jokes(inkycal_module):
         logger.debug(f'image size: {im_width} x {im_height} px')
 
         # Create an image for black pixels and one for coloured pixels
-        im_black = Image.new('RGB', size=im_size, color='white')
-        im_colour = Image.new('RGB', size=im_size, color='white')
-
-        # Check if internet is available
-        if internet_available():
-            logger.debug('Connection test passed')
-        else:
-            logger.error("Network not reachable. Please check your connection.")
-            raise NetworkNotReachableError
+        im_black = self.new_image(im_size)
+        im_colour = self.new_image(im_size)
 
         # Set some parameters for formatting feeds
         line_spacing = 5
@@ -70,14 +85,6 @@ class Jokes(inkycal_module):
 
         logger.debug(f'line positions: {line_positions}')
 
-        # Get the actual joke
-        url = "https://icanhazdadjoke.com"
-        header = {"accept": "text/plain"}
-        response = requests.get(url, headers=header)
-        response.encoding = 'utf-8'  # Change encoding to UTF-8
-        joke = response.text.rstrip()  # use to remove newlines
-        logger.debug(f"joke: {joke}")
-
         # wrap text in case joke is too large
         wrapped = text_wrap(joke, font=self.font, max_width=line_width)
         logger.debug(f"wrapped: {wrapped}")
@@ -28,6 +28,9 @@ logger = logging.getLogger(__name__)
 class Stocks(inkycal_module):
     name = "Stocks - Displays stock market infos from Yahoo finance"
 
+    # matplotlib's pyplot is not thread-safe
+    thread_safe = False
+
     # required parameters
     requires = {
 
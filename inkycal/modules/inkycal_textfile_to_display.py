@@ -19,6 +19,9 @@ class TextToDisplay(inkycal_module):
     """
     name = "TextToDisplay - Display text from a local file on the display"
 
+    # Only draws black and white, see inkycal_module.image_mode
+    image_mode = "L"
+
     def __init__(self, config):
         """Initialize inkycal_textfile_to_display module"""
 
@@ -48,8 +51,8 @@ class TextToDisplay(inkycal_module):
         logger.debug(f'Image size: {im_size}')
 
         # Create an image for black pixels and one for coloured pixels
-        im_black = Image.new('RGB', size=im_size, color='white')
-        im_colour = Image.new('RGB', size=im_size, color='white')
+        im_black = self.new_image(im_size)
+        im_colour = self.new_image(im_size)
 
         # Set some parameters for formatting feeds
         line_spacing = 4
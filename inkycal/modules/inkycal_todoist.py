@@ -19,6 +19,9 @@ class Todoist(inkycal_module):
 
     name = "Todoist API - show your todos from todoist"
 
+    # Only draws black and white, see inkycal_module.image_mode
+    image_mode = "L"
+
     requires = {
         'api_key': {
             "label": "Please enter your Todoist API-key",
@@ -63,18 +66,8 @@ class Todoist(inkycal_module):
         if not isinstance(self.api_key, str):
             print('api_key has to be a string: "Yourtopsecretkey123" ')
 
-    def generate_image(self):
-        """Generate image for this module"""
-
-        # Define new image size with respect to padding
-        im_width = int(self.width - (2 * self.padding_left))
-        im_height = int(self.height - (2 * self.padding_top))
-        im_size = im_width, im_height
-        logger.debug(f'Image size: {im_size}')
-
-        # Create an image for black pixels and one for coloured pixels
-        im_black = Image.new('RGB', size=im_size, color='white')
-        im_colour = Image.new('RGB', size=im_size, color='white')
+    def fetch(self):
+        """Fetches the projects and active tasks from todoist"""
 
         # Check if internet is available
         if internet_available():
@@ -83,20 +76,6 @@ class Todoist(inkycal_module):
             logger.error("Network not reachable. Please check your connection.")
             raise NetworkNotReachableError
 
-        # Set some parameters for formatting todos
-        line_spacing = 1
-        text_bbox_height = self.font.getbbox("hg")
-        line_height = text_bbox_height[3] + line_spacing
-        line_width = im_width
-        max_lines = im_height // line_height
-
-        # Calculate padding from top so the lines look centralised
-        spacing_top = int(im_height % line_height / 2)
-
-        # Calculate line_positions
-        line_positions = [
-            (0, spacing_top + _ * line_height) for _ in range(max_lines)]
-
         # Get all projects by name and id
         all_projects = self._api.get_projects()
         filtered_project_ids_and_names = {project.id: project.name for project in all_projects}
@@ -135,6 +114,35 @@ class Todoist(inkycal_module):
 
         logger.debug(f'simplified: {simplified}')
 
+        return {"projects": list(filtered_project_ids_and_names.values()), "tasks": simplified}
+
+    def render(self, data):
+        """Render the todos on the images for this module"""
+
+        # Define new image size with respect to padding
+        im_width = int(self.width - (2 * self.padding_left))
+        im_height = int(self.height - (2 * self.padding_top))
+        im_size = im_width, im_height
+        logger.debug(f'Image size: {im_size}')
+
+        # Create an image for black pixels and one for coloured pixels
+        im_black = self.new_image(im_size)
+        im_colour = self.new_image(im_size)
+
+        # Set some parameters for formatting todos
+        line_spacing = 1
+        text_bbox_height = self.font.getbbox("hg")
+        line_height = text_bbox_height[3] + line_spacing
+        max_lines = im_height // line_height
+
+        # Calculate padding from top so the lines look centralised
+        spacing_top = int(im_height % line_height / 2)
+
+        # Calculate line_positions
+        line_positions = [
+            (0, spacing_top + _ * line_height) for _ in range(max_lines)]
+
+        simplified = data["tasks"]
         project_lengths = []
         due_lengths = []
 
@@ -151,7 +159,7 @@ class Todoist(inkycal_module):
         due_offset = int(max(due_lengths)) if due_lengths else 0
 
         # create a dict with names of filtered groups
-        groups = {group_name:[] for group_name in filtered_project_ids_and_names.values()}
+        groups = {group_name:[] for group_name in data["projects"]}
         for task in simplified:
             group_of_current_task = task["project"]
             if group_of_current_task in groups:
@@ -52,6 +52,10 @@ class Xkcd(inkycal_module):
         self.alt = config['alt']
         self.scale_filter = config['filter']
 
+        # The latest comic only changes a few times a week, check for a new one every hour
+        if self.mode == 'latest' and 'refresh_interval' not in config:
+            self.refresh_interval = 60
+
         # give an OK message
         logger.debug(f'Inkycal XKCD loaded')
 
@@ -0,0 +1,177 @@
+"""Module process pool
+Runs selected modules (e.g. the ones using matplotlib) in a separate worker process. Their heavy
+imports never reach the main process, they run on another core and the memory they accumulate
+is reclaimed by replacing the worker process after a number of cycles.
+
+The generated images are sent back to the main process as raw bytes.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib import import_module
+
+from PIL import Image
+
+from inkycal.modules import registry
+
+logger = logging.getLogger(__name__)
+
+# Modules running in a worker process unless configured otherwise
+DEFAULT_ISOLATED = ("Fullweather", "Stocks")
+
+# Module instances of a worker process: position -> (config, instance)
+_instances = {}
+
+
+def _instance(config: dict, path: str):
+    """Returns the instance of a module in this worker process, created on first use"""
+    position = config["position"]
+    if position not in _instances or _instances[position][0] != config:
+        _instances[position] = (config, getattr(import_module(path), config["name"])(config))
+    return _instances[position][1]
+
+
+def _describe(config: dict, path: str) -> dict:
+    """Creates a module in the worker process and returns the attributes needed by the main process"""
+    module = _instance(config, path)
+    return {
+        "name": module.name,
+        "refresh_interval": getattr(module, "refresh_interval", None),
+        "deadline": getattr(module, "deadline", None),
+        "timings": getattr(module, "timings", {}),
+    }
+
+
+def _generate(config: dict, path: str) -> tuple:
+    """Generates the images of a module in the worker process, together with its attributes"""
+    black, colour = _instance(config, path).generate_image()
+    return _describe(config, path), _pack(black), _pack(colour)
+
+
+def _pack(image: Image or None) -> tuple or None:
+    if image is None:
+        return None
+    palette = image.getpalette() if image.mode == "P" else None
+    return image.mode, image.size, image.tobytes(), palette, image.info.get("transparency")
+
+
+def _unpack(packed: tuple or None) -> Image or None:
+    if packed is None:
+        return None
+    mode, size, data, palette, transparency = packed
+    image = Image.frombytes(mode, size, data)
+    if palette is not None:
+        image.putpalette(palette)
+    if transparency is not None:
+        image.info["transparency"] = transparency
+    return image
+
+
+class ModuleProcessPool:
+    """Worker processes running modules outside the main process.
+
+    Each worker keeps its module instances between cycles, so modules work the same way
+    as in the main process. The workers are started on first use.
+
+    Args:
+        workers (int): Number of worker processes.
+        recycle_after (int): Number of cycles after which the workers are replaced by fresh
+            processes, 0 to keep them forever.
+    """
+
+    def __init__(self, workers: int = 1, recycle_after: int = 24):
+        self.workers = workers
+        self.recycle_after = recycle_after
+        # spawn instead of fork, the main process runs several threads
+        self._context = multiprocessing.get_context("spawn")
+        self._executor = None
+        self._cycles = 0
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context)
+            return self._executor
+
+    def _call(self, function, config: dict):
+        """Runs a function in a worker process and waits for its result"""
+        executor = self._pool()
+        try:
+            return executor.submit(function, config, registry[config["name"]]).result()
+        except BrokenProcessPool:
+            # the worker died, e.g. killed when running out of memory. Start a new one next time.
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+    def module(self, config: dict) -> "IsolatedModule":
+        """Creates a module in a worker process.
+
+        No worker is started here, the module is created in the worker the first time it
+        generates its images. Until then the stand-in uses the defaults for its attributes.
+
+        Args:
+            config (dict): The entry of the module in the settings file.
+
+        Returns:
+            IsolatedModule: Stand-in for the module in the main process.
+        """
+        if config["name"] not in registry:
+            raise ImportError(f"No module named {config['name']} is registered")
+        return IsolatedModule(config, self)
+
+    def generate(self, config: dict) -> (dict, Image, Image):
+        """Generates the images of a module in a worker process and returns them with its attributes"""
+        attributes, black, colour = self._call(_generate, config)
+        return attributes, _unpack(black), _unpack(colour)
+
+    def next_cycle(self) -> None:
+        """Counts a cycle and replaces the workers once recycle_after cycles have passed"""
+        self._cycles += 1
+        if self.recycle_after and self._cycles >= self.recycle_after:
+            self._cycles = 0
+            self.recycle()
+
+    def recycle(self) -> None:
+        """Replaces the workers by fresh processes, freeing the memory they accumulated"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            logger.info("Replacing the module worker processes")
+            # modules which are still running finish before the old workers exit
+            executor.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """Stops the workers"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+class IsolatedModule:
+    """Stand-in for a module running in a worker process of a ModuleProcessPool"""
+
+    # generate_image only waits for the worker process
+    thread_safe = True
+
+    def __init__(self, config: dict, pool: ModuleProcessPool):
+        self.config = config
+        self._pool = pool
+        # known once the module generated its images in the worker
+        self.name = config["name"]
+        self.refresh_interval = None
+        self.deadline = None
+        self.timings = {}
+
+    def generate_image(self) -> (Image, Image):
+        attributes, black, colour = self._pool.generate(self.config)
+        self.name = attributes["name"]
+        self.refresh_interval = attributes["refresh_interval"]
+        self.deadline = attributes["deadline"]
+        self.timings = attributes["timings"]
+        return black, colour
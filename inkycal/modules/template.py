@@ -1,12 +1,34 @@
 """Inkycal module template"""
 import abc
+import hashlib
+import time
 
 from inkycal.custom import *
 
+logger = logging.getLogger(__name__)
+
 
 class inkycal_module(metaclass=abc.ABCMeta):
     """Generic base class for inkycal modules"""
 
+    # Modules are generated concurrently in worker threads. Set this to False if the
+    # module relies on global state which is not thread-safe, e.g. matplotlib's pyplot
+    thread_safe = True
+
+    # Time in minutes for which the last image of this module is reused instead of
+    # generating a new one. None regenerates the image on every update.
+    # Can be overwritten with 'refresh_interval' in the module's config.
+    refresh_interval = None
+
+    # Mode of the images created with new_image. Modules only drawing black, white and grey
+    # should use 'L' (or '1'), which needs a third of the memory of 'RGB' and allows Inkycal
+    # to assemble the canvas as greyscale planes. Modules creating RGB images still work.
+    image_mode = "RGB"
+
+    # Maximum time in seconds to generate the image before the last image is shown instead.
+    # None uses the default of Inkycal. Can be overwritten with 'deadline' in the module's config.
+    deadline = None
+
     @classmethod
     def __subclasshook__(cls, subclass):
         return (hasattr(subclass, 'generate_image') and
@@ -16,6 +38,13 @@ class inkycal_module(metaclass=abc.ABCMeta):
     def __init__(self, config):
         """Initialize module with given config"""
 
+        # generate_image is not abstract, so check here that the module can create images
+        cls = type(self)
+        if cls.generate_image is inkycal_module.generate_image and (
+                cls.fetch is inkycal_module.fetch or cls.render is inkycal_module.render):
+            raise TypeError(f"Can't instantiate module {cls.__name__}, it has to implement "
+                            f"generate_image, or fetch and render")
+
         # Initializes base module
         # sets properties shared amongst all sections
         self.config = conf = config['config']
@@ -25,9 +54,27 @@ class inkycal_module(metaclass=abc.ABCMeta):
         self.padding_top = self.padding_bottom = conf['padding_y']
 
         self.fontsize = conf["fontsize"]
+        self.refresh_interval = conf.get("refresh_interval", self.refresh_interval)
+        self.deadline = conf.get("deadline", self.deadline)
         self.font = ImageFont.truetype(
             fonts['NotoSansUI-Regular'], size=self.fontsize)
 
+        # Digest of the data of the last render and the images rendered from it, see generate_image
+        self._data_digest = None
+        self._rendered = None
+
+        # Seconds spent in fetch and render by the last generate_image, recorded in the metrics by Inkycal
+        self.timings = {}
+
+    @property
+    def data_digest(self) -> str or None:
+        """Digest of the data shown by the last images, None if the module does not use fetch and render"""
+        return self._data_digest
+
+    def new_image(self, size: (int, int), color="white") -> Image:
+        """Creates a new image for this module in its image_mode"""
+        return Image.new(self.image_mode, size=size, color=color)
+
     def set(self, help=False, **kwargs):
         """Set attributes of class, e.g. class.set(key=value)
         see that can be changed by setting help to True
@@ -40,6 +87,9 @@ class inkycal_module(metaclass=abc.ABCMeta):
             print('The following can be configured:')
             print(options)
 
+        # The images have to be rendered again with the new settings
+        self._data_digest = None
+
         for key, value in kwargs.items():
             if key in options:
                 if key == 'fontsize':
@@ -58,9 +108,37 @@ class inkycal_module(metaclass=abc.ABCMeta):
         except AttributeError:
             print('no validation implemented')
 
-    @abc.abstractmethod
     def generate_image(self):
-        # Generate image for this module with specified parameters
+        """Generates the images (black, colour) of this module.
+
+        Modules either implement this method or split it into fetch and render. Then the
+        images are only rendered again when the fetched data changed since the last call.
+        The images returned are copies, so Inkycal can draw on them (e.g. the border).
+        """
+        start = time.perf_counter()
+        data = self.fetch()
+        digest = hashlib.blake2b(json.dumps(data, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+        self.timings = {"fetch": time.perf_counter() - start}
+        if digest == self._data_digest and self._rendered is not None:
+            logger.debug(f"{type(self).__name__}: data did not change, reusing the last images")
+        else:
+            start = time.perf_counter()
+            self._rendered = self.render(data)
+            self._data_digest = digest
+            self.timings["render"] = time.perf_counter() - start
+        return tuple(image.copy() if image is not None else None for image in self._rendered)
+
+    def fetch(self):
+        """Fetches the data shown by this module, e.g. events or tasks.
+
+        Has to return plain data (dicts, lists, strings, numbers) including everything
+        render depends on, e.g. the current date, as it is used to detect changes.
+        """
+        raise NotImplementedError(
+            'The developers were too lazy to implement this function')
+
+    def render(self, data) -> (Image, Image):
+        """Renders the images (black, colour) showing the data returned by fetch"""
         raise NotImplementedError(
             'The developers were too lazy to implement this function')
 
@@ -1,2 +1,6 @@
 from .pisugar import PiSugar
-from .json_cache import JSONCache
\ No newline at end of file
+from .json_cache import JSONCache
+from .metrics import Metrics
+from .bitmap_store import BitmapStore
+from .memory_profiler import MemoryProfiler
+from .control import ControlServer
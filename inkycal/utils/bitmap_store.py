@@ -0,0 +1,143 @@
+"""Bitmap store
+Keeps the last successfully generated image of each module on disk, so it survives reboots.
+Images are stored as packed 1-bit planes (black and colour band) in a compressed numpy file,
+together with their metadata: the time they were generated, the digest of the data the module
+rendered (if the module reports it), a hash of the images and their size.
+
+Entries are keyed by the position of the module and a hash of its configuration, so a changed
+configuration never shows an outdated image.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy
+from PIL import Image
+
+from inkycal.settings import Settings
+
+settings = Settings()
+
+logger = logging.getLogger(__name__)
+
+
+class BitmapStore:
+    """Persistent store for the last good image of each module.
+
+    Args:
+        name (str): The name of the folder in the cache folder holding the images.
+    """
+
+    # Pixels whose red and green are not brighter than this are black (or coloured) in the packed
+    # planes, the same threshold Inkycal uses when it optimizes the canvas
+    threshold = 220
+
+    def __init__(self, name: str = "module_bitmaps"):
+        self.path = os.path.join(settings.CACHE_PATH, name)
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def config_hash(config: dict) -> str:
+        """Returns a short hash of the given module configuration."""
+        return hashlib.blake2b(json.dumps(config, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+
+    def _filename(self, position: int, config_hash: str) -> str:
+        return os.path.join(self.path, f"module{position}_{config_hash}.npz")
+
+    @classmethod
+    def _pack(cls, image: Image or None) -> numpy.ndarray:
+        """Packs an image to a 1-bit plane, 1 meaning black (or colour)."""
+        if image is None:
+            return numpy.zeros(0, dtype=numpy.uint8)
+        if image.mode in ("RGBA", "LA", "P"):
+            # transparent pixels are not pasted on the canvas, treat them as white
+            background = Image.new("RGBA", image.size, "white")
+            image = Image.alpha_composite(background, image.convert("RGBA"))
+        if image.mode in ("1", "L"):
+            pixels = numpy.asarray(image.convert("L"))
+        else:
+            red, green, _ = (numpy.asarray(plane) for plane in image.convert("RGB").split())
+            pixels = numpy.maximum(red, green)
+        return numpy.packbits(pixels <= cls.threshold, axis=1)
+
+    @staticmethod
+    def _unpack(plane: numpy.ndarray, size: tuple) -> Image or None:
+        if plane.size == 0:
+            return None
+        width, height = size
+        pixels = numpy.unpackbits(plane, axis=1, count=width)
+        return Image.fromarray(numpy.where(pixels, 0, 255).astype(numpy.uint8), "L").convert("1")
+
+    def save(self, position: int, config: dict, black: Image, colour: Image or None,
+             data_hash: str or None = None) -> None:
+        """Stores the images of a module, replacing older images of the same position.
+
+        Args:
+            data_hash (str): Digest of the data the images show, e.g. the data fetched by the module.
+        """
+        config_hash = self.config_hash(config)
+        black_plane, colour_plane = self._pack(black), self._pack(colour)
+        image_hash = hashlib.blake2b(black_plane.tobytes() + colour_plane.tobytes(), digest_size=16).hexdigest()
+        filename = self._filename(position, config_hash)
+        metadata = {
+            "timestamp": time.time(),
+            "data_hash": data_hash,
+            "image_hash": image_hash,
+            "size": list(black.size),
+            "config_hash": config_hash,
+        }
+
+        with self._lock:
+            # writing the same images again would only wear the SD card
+            if self.metadata(position, config).get("image_hash") == image_hash:
+                return
+
+            tmp_path = f"{filename}.tmp"
+            with open(tmp_path, "wb") as file:
+                numpy.savez_compressed(
+                    file, black=black_plane, colour=colour_plane, metadata=numpy.array(json.dumps(metadata))
+                )
+            os.replace(tmp_path, filename)
+
+            # remove images of previous configurations of this position
+            for entry in os.listdir(self.path):
+                if entry.startswith(f"module{position}_") and entry != os.path.basename(filename):
+                    os.remove(os.path.join(self.path, entry))
+
+    def load(self, position: int, config: dict) -> dict or None:
+        """Loads the stored images of a module.
+
+        Returns:
+            dict: The black and colour image ('1' mode, colour may be None) and the metadata: the
+            time they were generated (time.time), the digest of the data they show (may be None),
+            the hash of the images, their size and the hash of the config. None if nothing was stored.
+        """
+        filename = self._filename(position, self.config_hash(config))
+        if not os.path.exists(filename):
+            return None
+        try:
+            with numpy.load(filename) as data:
+                metadata = json.loads(str(data["metadata"]))
+                size = tuple(metadata["size"])
+                return {
+                    "black": self._unpack(data["black"], size),
+                    "colour": self._unpack(data["colour"], size),
+                    **metadata,
+                }
+        except Exception:
+            logger.exception(f"Could not load the stored image of module {position}")
+            return None
+
+    def metadata(self, position: int, config: dict) -> dict:
+        """Returns the metadata of the stored images of a module without unpacking them, see load."""
+        filename = self._filename(position, self.config_hash(config))
+        try:
+            with numpy.load(filename) as data:
+                return json.loads(str(data["metadata"]))
+        except Exception:
+            return {}
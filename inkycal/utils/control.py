@@ -0,0 +1,95 @@
+"""Control socket
+Local control channel of a running Inkycal: a Unix domain socket accepting one command per
+connection, e.g. `refresh` or `refresh 2`. Each command is answered with one line of JSON.
+
+Use it from the command line with `python -m inkycal control <command>`.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+
+from inkycal.settings import Settings
+
+settings = Settings()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = os.path.join(settings.CACHE_PATH, "inkycal.sock")
+
+
+class ControlServer:
+    """Serves the control socket in the asyncio loop of Inkycal.
+
+    Args:
+        path (str): Path of the socket file.
+        handler: Coroutine function called with the command and a list of its arguments.
+            Returns a dict which is sent back, raises an exception if the command failed.
+    """
+
+    def __init__(self, path: str, handler):
+        self.path = path
+        self.handler = handler
+        self._server = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            try:
+                send_command("ping", path=self.path, timeout=1)
+            except OSError:
+                # left behind by a previous run
+                os.remove(self.path)
+            else:
+                raise RuntimeError(f"Another Inkycal is listening on {self.path}")
+
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Listening for commands on {self.path}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            words = (await asyncio.wait_for(reader.readline(), 5)).decode().split()
+            if not words:
+                reply = {"ok": False, "error": "No command given"}
+            elif words[0] == "ping":
+                reply = {"ok": True}
+            else:
+                logger.info(f"Received command: {' '.join(words)}")
+                try:
+                    reply = {"ok": True, **(await self.handler(words[0], words[1:]) or {})}
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+            writer.write(json.dumps(reply, default=str).encode() + b"\n")
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, UnicodeDecodeError):
+            logger.warning("Invalid request on the control socket")
+        finally:
+            writer.close()
+
+
+def send_command(command: str, *args, path: str = DEFAULT_SOCKET, timeout: float = 30) -> dict:
+    """Sends a command to a running Inkycal and returns its reply.
+
+    Raises:
+        OSError: If no Inkycal is listening on the socket.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(" ".join((command, *map(str, args))).encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply)
@@ -0,0 +1,127 @@
+"""Memory profiler
+Measures how much memory each module allocates, to find modules which leak memory in
+long-running Inkycal processes. Uses tracemalloc for the python allocations and the resident
+set size (RSS) of the process for everything else, e.g. memory of C extensions.
+
+Profiling slows modules down noticeably and is therefore only enabled with the
+`memory_profiling` option of the settings file. Modules still run concurrently while profiling,
+so the values of modules running at the same time include each other's allocations.
+"""
+import gc
+import logging
+import os
+import resource
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import arrow
+
+from inkycal.settings import Settings
+
+settings = Settings()
+
+logger = logging.getLogger(__name__)
+
+
+def rss() -> int:
+    """Returns the resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # no procfs, fall back to the peak RSS (kilobytes on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryProfiler:
+    """Records the memory used by each module in the metrics.
+
+    Measured sections (e.g. modules) still run concurrently, only the bookkeeping before and
+    after them is serialised. tracemalloc can not tell apart the allocations of different
+    threads, so the values of sections which overlap include each other's allocations, and the
+    peak of a section can be missed when another one starts meanwhile (it resets the peak).
+
+    Args:
+        metrics (Metrics): The metrics the measurements are recorded in.
+        frames (int): Number of stack frames stored for each allocation.
+        name (str): The name of the report file in the cache folder.
+    """
+
+    # Allocations of these files are caused by profiling itself
+    ignored = ("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", tracemalloc.__file__)
+
+    def __init__(self, metrics, frames: int = 10, name: str = "memory_report"):
+        self.metrics = metrics
+        self.report_path = os.path.join(settings.CACHE_PATH, f"{name}.txt")
+        self._lock = threading.Lock()
+        self._baseline = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @contextmanager
+    def measure(self, name: str):
+        """Context manager recording the memory used inside it.
+
+        Records <name>_mem_peak (highest python allocations), <name>_mem_retained (python
+        allocations still alive after garbage collection) and <name>_rss_delta, all in bytes.
+        """
+        with self._lock:
+            gc.collect()
+            rss_before = rss()
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            with self._lock:
+                peak = max(tracemalloc.get_traced_memory()[1] - traced_before, 0)
+                gc.collect()
+                retained = tracemalloc.get_traced_memory()[0] - traced_before
+                self.metrics.set(f"{name}_mem_peak", peak)
+                self.metrics.set(f"{name}_mem_retained", retained)
+                self.metrics.set(f"{name}_rss_delta", rss() - rss_before)
+
+    def sample(self) -> None:
+        """Records the memory of the whole process, call once per cycle.
+
+        The first call also takes the snapshot the reports are compared with.
+        """
+        self.metrics.set("rss", rss())
+        self.metrics.set("mem_traced", tracemalloc.get_traced_memory()[0])
+        if self._baseline is None:
+            self._baseline = self._snapshot()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in self.ignored]
+        )
+
+    def write_report(self, top: int = 10) -> str:
+        """Writes the allocation sites using the most memory to the report file.
+
+        Lists the sites with the largest allocations and the sites which grew the most since
+        the first cycle, which are the usual suspects for leaks.
+
+        Returns:
+            str: The path of the report file.
+        """
+        snapshot = self._snapshot()
+        lines = [
+            f"Memory report {arrow.now().format('YYYY-MM-DD HH:mm:ss')}",
+            f"RSS: {rss() / 1024 ** 2:.1f} MiB, traced: {tracemalloc.get_traced_memory()[0] / 1024 ** 2:.1f} MiB",
+            "",
+            f"Top {top} allocation sites:",
+        ]
+        lines += [f"  {stat}" for stat in snapshot.statistics("lineno")[:top]]
+
+        if self._baseline is not None:
+            lines += ["", f"Top {top} growing allocation sites since the first cycle:"]
+            lines += [f"  {stat}" for stat in snapshot.compare_to(self._baseline, "lineno")[:top]]
+
+        tmp_path = f"{self.report_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.report_path)
+        logger.info(f"Memory report written to {self.report_path}")
+        return self.report_path
@@ -0,0 +1,146 @@
+"""Metrics
+Records how long each stage of an Inkycal cycle takes. The results of each cycle are appended
+to a rotating JSON-lines file and written to a Prometheus textfile-collector file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import arrow
+import numpy
+
+from inkycal.settings import Settings
+
+settings = Settings()
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Collects the durations of the stages of a cycle.
+
+    Durations of the same stage within a cycle are added up, e.g. when the display driver
+    waits for the busy pin several times. Recording is thread-safe, so stages can be
+    timed from the module worker threads.
+
+    Args:
+        name (str): The name of the metrics files in the cache folder.
+        history (int): Number of past cycles used to calculate the cycle percentiles.
+    """
+
+    percentiles = (50, 90, 99)
+
+    def __init__(self, name: str = "inkycal_metrics", history: int = 100):
+        if not os.path.exists(settings.CACHE_PATH):
+            os.makedirs(settings.CACHE_PATH)
+
+        self.jsonl_path = os.path.join(settings.CACHE_PATH, f"{name}.jsonl")
+        self.prometheus_path = os.path.join(settings.CACHE_PATH, f"{name}.prom")
+
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._values = {}
+        self._cycle_start = None
+        self._cycle_durations = deque(maxlen=history)
+
+        # Use a dedicated logger to append the records, which takes care of rotating the file
+        self._writer = logging.getLogger(f"{__name__}.{name}")
+        self._writer.propagate = False
+        self._writer.setLevel(logging.INFO)
+        if not self._writer.handlers:
+            handler = RotatingFileHandler(self.jsonl_path, maxBytes=1024 * 1024, backupCount=3)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._writer.addHandler(handler)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Context manager recording the time spent inside it for the given stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Adds a duration in seconds to the given stage of the current cycle."""
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def set(self, name: str, value: float) -> None:
+        """Sets a value of the current cycle, e.g. a counter or a size."""
+        with self._lock:
+            self._values[name] = value
+
+    def start_cycle(self) -> None:
+        """Starts a new cycle, discarding everything recorded since the last cycle."""
+        with self._lock:
+            self._stages = {}
+            self._values = {}
+            self._cycle_start = time.perf_counter()
+
+    def end_cycle(self) -> dict:
+        """Ends the current cycle and writes its record to the metrics files.
+
+        Returns:
+            dict: The record of this cycle.
+        """
+        with self._lock:
+            duration = time.perf_counter() - self._cycle_start if self._cycle_start else 0.0
+            self._cycle_durations.append(duration)
+            record = {
+                "timestamp": arrow.now().isoformat(),
+                "duration": round(duration, 4),
+                "stages": {stage: round(seconds, 4) for stage, seconds in sorted(self._stages.items())},
+                "values": dict(sorted(self._values.items())),
+                "percentiles": self._cycle_percentiles(),
+            }
+            self._cycle_start = None
+
+        try:
+            self._writer.info(json.dumps(record))
+            self._write_prometheus(record)
+        except OSError:
+            logger.exception("Could not write metrics")
+        return record
+
+    def _cycle_percentiles(self) -> dict:
+        """Percentiles of the durations of the recent cycles."""
+        values = numpy.percentile(self._cycle_durations, self.percentiles)
+        return {f"p{p}": round(float(value), 4) for p, value in zip(self.percentiles, values)}
+
+    def _write_prometheus(self, record: dict) -> None:
+        """Writes the record in the Prometheus text format. The file is replaced atomically."""
+        lines = [
+            "# HELP inkycal_cycle_seconds Duration of the last cycle in seconds.",
+            "# TYPE inkycal_cycle_seconds gauge",
+            f"inkycal_cycle_seconds {record['duration']}",
+            "# HELP inkycal_cycle_seconds_percentile Percentiles of the durations of the recent cycles.",
+            "# TYPE inkycal_cycle_seconds_percentile gauge",
+        ]
+        for name, value in record["percentiles"].items():
+            lines.append(f'inkycal_cycle_seconds_percentile{{percentile="{name[1:]}"}} {value}')
+
+        lines += [
+            "# HELP inkycal_stage_seconds Time spent in each stage of the last cycle in seconds.",
+            "# TYPE inkycal_stage_seconds gauge",
+        ]
+        for stage, seconds in record["stages"].items():
+            lines.append(f'inkycal_stage_seconds{{stage="{stage}"}} {seconds}')
+
+        if record["values"]:
+            lines += [
+                "# HELP inkycal_value Values recorded during the last cycle.",
+                "# TYPE inkycal_value gauge",
+            ]
+            for name, value in record["values"].items():
+                lines.append(f'inkycal_value{{name="{name}"}} {value}')
+
+        tmp_path = f"{self.prometheus_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_path)
@@ -0,0 +1,165 @@
+"""Startup profiler
+Measures where the time of a cold start of Inkycal goes: python imports (like python -X importtime),
+font discovery, display driver import and hardware init, and construction of the modules.
+
+Every measurement runs in a fresh python interpreter, so nothing is cached from previous imports.
+Caches, images and logs written while profiling go to a temporary folder.
+Use it from the command line with `python -m inkycal profile-startup`.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from inkycal.settings import Settings
+
+settings = Settings()
+
+# Folder containing the inkycal package, used as working directory of the profiled interpreter
+basedir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Executed in a fresh interpreter with -X importtime, prints the timings of each stage as JSON
+_CHILD = """
+import importlib.util, json, os, sys, tempfile, time
+settings_path, render = sys.argv[1], sys.argv[2] == "1"
+stages = {}
+
+# Caches, images and logs go to a temporary folder, profiling leaves no files behind. The settings
+# are loaded on their own, importing inkycal.settings would import the whole package.
+package = importlib.util.find_spec("inkycal").submodule_search_locations[0]
+spec = importlib.util.spec_from_file_location("inkycal.settings", os.path.join(package, "settings.py"))
+sys.modules[spec.name] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules[spec.name])
+Settings = sys.modules[spec.name].Settings
+temporary = tempfile.TemporaryDirectory()
+Settings.CACHE_PATH = os.path.join(temporary.name, "cache")
+Settings.IMAGE_FOLDER = os.path.join(temporary.name, "image_folder")
+Settings.LOG_PATH = os.path.join(temporary.name, "logs")
+Settings.INKYCAL_LOG_PATH = os.path.join(Settings.LOG_PATH, "inkycal.log")
+
+# The fonts are discovered while importing inkycal, time that first walk of the font folder
+walk, walks = os.walk, []
+def timed_walk(top, *args, **kwargs):
+    start = time.perf_counter()
+    yield from walk(top, *args, **kwargs)
+    walks.append((top, time.perf_counter() - start))
+os.walk = timed_walk
+
+def timed(stage, function, *args):
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as e:
+        stages[f"{stage} (failed: {type(e).__name__})"] = time.perf_counter() - start
+        return None
+    stages[stage] = time.perf_counter() - start
+    return result
+
+timed("import inkycal", __import__, "inkycal")
+os.walk = walk
+stages["font discovery (part of import)"] = next((s for top, s in walks if top == Settings.FONT_PATH), 0.0)
+
+with open(settings_path) as file:
+    config = json.load(file)
+
+if render:
+    from inkycal.display.display import import_driver
+    driver = timed("driver import (incl. epdconfig)", import_driver, config["model"])
+    if driver is not None:
+        timed("driver init (EPD)", driver.EPD)
+
+from inkycal.modules import load_module
+for module in config["modules"]:
+    cls = timed(f"module import: {module['name']}", load_module, module["name"])
+    if cls is not None:
+        timed(f"module init: {module['name']}", cls, module)
+
+from inkycal import Inkycal
+timed("Inkycal init (render=False)", Inkycal, settings_path, False)
+print(json.dumps(stages))
+temporary.cleanup()
+"""
+
+
+def find_settings_path() -> str:
+    """Returns the path of the settings.json file in one of the default locations"""
+    for location in settings.SETTINGS_JSON_PATHS:
+        if os.path.exists(location):
+            return location
+    raise FileNotFoundError(f"No settings.json file could be found in {settings.SETTINGS_JSON_PATHS}")
+
+
+def _parse_importtime(output: str) -> list:
+    """Parses the output of python -X importtime.
+
+    Returns:
+        A list of dicts with the name, depth, self and cumulative time (seconds) of each import.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split("|", 2)
+        self_us = int(self_us.replace("import time:", ""))
+        # nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append({"name": name.strip(), "depth": depth, "self": self_us / 1e6,
+                        "cumulative": int(cumulative_us) / 1e6})
+    return imports
+
+
+def profile_startup(settings_path: str or None = None, render: bool = False, top: int = 15) -> dict:
+    """Profiles a cold start of Inkycal.
+
+    Args:
+        settings_path (str): Path of the settings.json file. Searches the default locations if not given.
+        render (bool): Also import and initialise the display driver.
+        top (int): Number of the slowest imports to report.
+
+    Returns:
+        dict: The total cold start time, the interpreter startup time, the time of each stage
+        and the slowest imports (all in seconds).
+    """
+    settings_path = settings_path or find_settings_path()
+
+    # Time needed to start a bare interpreter, not caused by Inkycal
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, settings_path, "1" if render else "0"],
+        capture_output=True, text=True, cwd=basedir
+    )
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Profiling Inkycal failed:\n{result.stderr[-2000:]}")
+
+    imports = _parse_importtime(result.stderr)
+    return {
+        "total": total,
+        "interpreter": interpreter,
+        "stages": json.loads(result.stdout.strip().splitlines()[-1]),
+        "imports": sorted(imports, key=lambda i: i["self"], reverse=True)[:top],
+        "packages": sorted([i for i in imports if i["depth"] == 0],
+                           key=lambda i: i["cumulative"], reverse=True)[:top],
+    }
+
+
+def print_report(report: dict) -> None:
+    """Prints the result of profile_startup in a readable form"""
+    print(f"Cold start: {report['total']:.3f}s (bare interpreter: {report['interpreter']:.3f}s)\n")
+
+    print("Stages:")
+    for stage, seconds in report["stages"].items():
+        print(f"  {seconds:8.3f}s  {stage}")
+
+    print("\nSlowest top-level imports (cumulative):")
+    for entry in report["packages"]:
+        print(f"  {entry['cumulative']:8.3f}s  {entry['name']}")
+
+    print("\nSlowest imports (self):")
+    for entry in report["imports"]:
+        print(f"  {entry['self']:8.3f}s  {entry['name']}")
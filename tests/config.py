@@ -31,6 +31,9 @@ class Config:
 
     TEST_SETTINGS_PATH = f"{basedir}/settings.json"
 
+    # startup benchmark: maximum time in seconds for a cold start of Inkycal
+    STARTUP_BUDGET = float(get("STARTUP_BUDGET", 10))
+
     # inkycal_tindie_test
     TINDIE_API_KEY = get("TINDIE_API_KEY")
     TINDIE_USERNAME = get("TINDIE_USERNAME")
@@ -0,0 +1,50 @@
+"""
+Test the bitmap store
+"""
+import shutil
+import unittest
+
+from PIL import Image, ImageChops, ImageDraw
+
+from inkycal.utils import BitmapStore
+
+
+class TestBitmapStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = BitmapStore(name="test_module_bitmaps")
+        self.config = {"position": 1, "name": "Jokes", "config": {"size": [61, 20]}}
+
+    def tearDown(self):
+        shutil.rmtree(self.store.path, ignore_errors=True)
+
+    def test_save_and_load(self):
+        black = Image.new("RGB", (61, 20), "white")
+        ImageDraw.Draw(black).rectangle((3, 2, 40, 10), fill="black")
+        self.store.save(1, self.config, black, None, data_hash="abc")
+
+        stored = self.store.load(1, self.config)
+        assert stored["colour"] is None
+        assert stored["black"].size == black.size
+        assert ImageChops.difference(stored["black"].convert("RGB"), black).getbbox() is None
+        assert stored["data_hash"] == "abc"
+        assert stored["size"] == [61, 20]
+        assert stored["timestamp"] and stored["image_hash"]
+        assert self.store.metadata(1, self.config)["image_hash"] == stored["image_hash"]
+
+        # a different configuration does not use the stored image
+        assert self.store.load(1, {**self.config, "config": {"size": [61, 30]}}) is None
+
+    def test_threshold(self):
+        # pixels are stored black the same way Inkycal optimizes the canvas
+        black = Image.new("L", (2, 1), 230)
+        black.putpixel((0, 0), 200)
+        self.store.save(1, self.config, black, None)
+
+        stored = self.store.load(1, self.config)["black"].convert("L")
+        assert stored.getpixel((0, 0)) == 0
+        assert stored.getpixel((1, 0)) == 255
+
+
+if __name__ == "__main__":
+    unittest.main()
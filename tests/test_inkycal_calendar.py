@@ -4,6 +4,8 @@ inkycal_calendar unittest
 import logging
 import unittest
 
+import arrow
+
 from inkycal.modules import Calendar
 from inkycal.modules.inky_image import Inkyimage
 from tests import Config
@@ -77,3 +79,18 @@ class TestCalendar(unittest.TestCase):
             print('OK')
             if Config.USE_PREVIEW:
                 merge(im_black, im_colour).show()
+
+    def test_ended_events(self):
+        module = Calendar(tests[3])
+        now = arrow.now(tz=module.timezone)
+        event = {"title": "Meeting", "begin": now.shift(hours=-2), "end": now.shift(hours=-1)}
+        data = {"today": now.floor('day'), "days_with_events": [], "upcoming_events": [dict(event, ended=True)]}
+
+        # events which already ended are not drawn, but are not treated as no events either
+        ended = module.render(data)
+        shown = module.render(dict(data, upcoming_events=[dict(event, ended=False)]))
+        empty = module.render(dict(data, upcoming_events=[]))
+        assert ended[0].tobytes() != shown[0].tobytes()
+        assert ended[1].tobytes() != shown[1].tobytes()
+        assert ended[0].tobytes() != empty[0].tobytes()
+        assert ended[1].tobytes() == empty[1].tobytes()
@@ -1,9 +1,19 @@
 """
 Test main module
 """
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
+from PIL import Image
+
 from inkycal import Inkycal
+from inkycal.utils.control import send_command
 from tests import Config
 
 
@@ -20,11 +30,369 @@ class TestMain(unittest.TestCase):
         assert inkycal.settings["info_section"] is True
         assert inkycal.settings["info_section_height"] == 70
         assert inkycal.settings["border_around_modules"] is True
+        assert sorted(inkycal.modules) == [1, 2, 3]
+        assert type(inkycal.modules[2]).__name__ == "Calendar"
+        # images are only saved in the image folder when enabled
+        assert inkycal.export_images is False
 
     def test_dry_run(self):
         inkycal = Inkycal(self.settings_path, render=False)
         inkycal.dry_run()
 
+    def test_dry_run_in_event_loop(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        cycles = []
+
+        async def process_modules():
+            cycles.append(threading.current_thread())
+            return [], []
+
+        inkycal._process_modules = process_modules
+
+        async def caller():
+            inkycal.dry_run()
+
+        # dry_run runs the modules in an event loop of its own
+        asyncio.run(caller())
+        assert len(cycles) == 1 and cycles[0] is not threading.main_thread()
+
+    def test_hung_module_abandoned(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        inkycal.module_deadline = 0.2
+        release = threading.Event()
+
+        class Module:
+            def __init__(self, size, hangs=False):
+                self.size, self.hangs = size, hangs
+
+            def generate_image(self):
+                if self.hangs:
+                    release.wait(30)
+                return Image.new("L", self.size, "white"), Image.new("L", self.size, "white")
+
+        inkycal.modules = {number: Module(box[2:], hangs=number == 1) for number, box in inkycal._layout.items()}
+        executor = inkycal._executor
+        try:
+            asyncio.run(asyncio.wait_for(inkycal.run(run_once=True), 30))
+            # the run ended without waiting for the module, its pool does not take new work
+            assert executor._shutdown
+            assert inkycal._executor is not executor
+        finally:
+            release.set()
+
+    def test_refresh_interval(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        inkycal.modules[1].refresh_interval = 60
+
+        # a recently generated image is reused without calling the module
+        image = Image.new("RGB", (10, 10), "white")
+        inkycal._module_images[1] = (image, image)
+        inkycal._module_updates[1] = time.monotonic()
+        assert inkycal.process_module(1) is True
+        assert inkycal._module_images[1] == (image, image)
+
+        # once the refresh interval expired, the module has to generate a new image
+        inkycal._module_updates[1] = time.monotonic() - 60 * 60
+        assert inkycal._is_fresh(1, inkycal.modules[1]) is False
+
+    def test_module_timings(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        image = Image.new("RGB", (10, 10), "white")
+        inkycal.modules[1].generate_image = lambda: (image, image)
+        inkycal.modules[1].timings = {"fetch": 0.5, "render": 0.25}
+
+        # the fetch and render steps of a module are recorded next to its total time
+        inkycal.metrics.start_cycle()
+        assert inkycal.process_module(1) is True
+        stages = inkycal.metrics.end_cycle()["stages"]
+        assert stages["module_1_fetch"] == 0.5 and stages["module_1_render"] == 0.25
+        assert "module_1" in stages
+
+    def test_deadline(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        image = Image.new("RGB", (10, 10), "white")
+        inkycal._module_images[1] = (image, image)
+        inkycal.modules[1].deadline = 0.1
+
+        release = threading.Event()
+        inkycal.modules[1].generate_image = lambda: release.wait(5) and (image, image)
+
+        # a module missing its deadline keeps its last image and is marked as stale
+        try:
+            assert asyncio.run(inkycal._run_module(1)) is None
+        finally:
+            release.set()
+        inkycal._running[1].result(5)
+
+    def test_prefetch_lead(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        assert inkycal._prefetch_lead() == 0
+
+        inkycal._prepare_durations.extend([10, 12, 11])
+        assert 13 < inkycal._prefetch_lead() < 20
+
+        inkycal.max_prefetch_lead = 5
+        assert inkycal._prefetch_lead() == 5
+
+    def test_post_process(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        black = Image.new("RGB", (4, 1), "white")
+        colour = Image.new("RGB", (4, 1), "white")
+        black.putpixel((0, 0), (200, 200, 200))  # dark grey -> black
+        black.putpixel((1, 0), (230, 230, 230))  # light grey stays
+        colour.putpixel((2, 0), (100, 100, 100))
+
+        im_black, im_colour, preview = inkycal._post_process(black, colour)
+        assert [im_black.getpixel((x, 0)) for x in range(4)] == [(0, 0, 0), (230, 230, 230), (255, 255, 255), (255, 255, 255)]
+        assert im_colour.getpixel((2, 0)) == (0, 0, 0)
+        assert [preview.getpixel((x, 0)) for x in range(4)] == [(0, 0, 0), (230, 230, 230), (255, 0, 0), (255, 255, 255)]
+
+        assert inkycal._post_process(black, colour, preview=False)[2] is None
+
+    def test_greyscale_images(self):
+        assert Inkycal._is_greyscale(Image.new("1", (2, 2)))
+        assert Inkycal._is_greyscale(Image.new("L", (2, 2)))
+        assert Inkycal._is_greyscale(Image.new("RGB", (2, 2)).convert("P"))
+        assert not Inkycal._is_greyscale(Image.new("RGB", (2, 2), "red").convert("P"))
+        assert not Inkycal._is_greyscale(Image.new("RGB", (2, 2)))
+
+        # the coloured band is shown on top of the black band
+        black, colour = Image.new("L", (2, 1), "white"), Image.new("L", (2, 1), "white")
+        black.putpixel((0, 0), 0)
+        colour.putpixel((1, 0), 0)
+        merged = Inkycal._merge_bands(black, colour)
+        assert merged.mode == "L"
+        assert [merged.getpixel((x, 0)) for x in range(2)] == [0, 0]
+
+    def test_layout(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        sizes = {module["position"]: module["config"]["size"] for module in inkycal.settings["modules"]}
+        width, height = inkycal._canvas_size
+
+        # stacked (default): each section starts below the previous one
+        assert inkycal._layout[1] == (0, 0, *sizes[1])
+        assert inkycal._layout[2] == (0, sizes[1][1], *sizes[2])
+        assert inkycal._info_box == (0, height - inkycal.settings["info_section_height"], width,
+                                     inkycal.settings["info_section_height"])
+
+        # grid: sections are placed next to each other, wrapping to the next row
+        for module in inkycal.settings["modules"]:
+            module["config"]["size"] = [width // 2, 100]
+        inkycal.settings["layout"] = "grid"
+        inkycal._compile_layout()
+        assert [inkycal._layout[i][:2] for i in (1, 2, 3)] == [(0, 0), (width // 2, 0), (0, 100)]
+
+        inkycal.settings["layout"] = "diagonal"
+        self.assertRaises(ValueError, inkycal._compile_layout)
+
+    def test_unchanged_frame(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        inkycal.info = "info"
+        for number, (_, _, width, height) in inkycal._layout.items():
+            image = Image.new("L", (width, height), "white")
+            inkycal._module_images[number] = (image, image)
+            inkycal._module_digests[number] = inkycal._image_digest(image, image)
+
+        frame = inkycal._assemble()
+        assert inkycal._frame_changed is True
+
+        # nothing changed, the last frame is reused without drawing anything
+        assert inkycal._assemble()[0] is frame[0]
+        assert inkycal._frame_changed is False
+
+        inkycal.info = "new info"
+        inkycal._assemble()
+        assert inkycal._frame_changed is True
+
+    def test_unchanged_module_not_stored(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        stored = []
+        inkycal._store_bitmap = lambda number, black, colour: stored.append(number)
+
+        class Module:
+            def __init__(self, size):
+                self.size = size
+
+            def generate_image(self):
+                # new, but identical images in every cycle
+                return Image.new("L", self.size, "white"), Image.new("L", self.size, "white")
+
+        inkycal.modules = {number: Module(box[2:]) for number, box in inkycal._layout.items()}
+        asyncio.run(inkycal._process_modules())
+        asyncio.run(inkycal._process_modules())
+
+        # the images of a module are only stored again when they changed
+        assert sorted(stored) == sorted(inkycal.modules)
+
+    def test_control(self):
+        inkycal = Inkycal(self.settings_path, render=False)
+        inkycal.control_socket = os.path.join(tempfile.mkdtemp(), "inkycal.sock")
+        cycles = []
+
+        async def process_modules():
+            cycles.append(time.monotonic())
+            return [], []
+
+        inkycal._process_modules = process_modules
+
+        async def command(*args):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: send_command(*args, path=inkycal.control_socket))
+
+        async def control():
+            task = asyncio.create_task(inkycal.run())
+            while not cycles or not os.path.exists(inkycal.control_socket):
+                await asyncio.sleep(0.05)
+
+            # the sleep until the next update is ended right away
+            assert (await command("refresh", 1))["ok"] is True
+            while len(cycles) < 2:
+                await asyncio.sleep(0.05)
+            assert 1 not in inkycal._module_updates
+
+            reply = await command("metrics")
+            assert reply["ok"] is True and "duration" in reply["metrics"]
+            assert (await command("refresh", 99))["ok"] is False
+            assert (await command("unknown"))["ok"] is False
+            task.cancel()
+
+        try:
+            asyncio.run(asyncio.wait_for(control(), 60))
+        finally:
+            if os.path.exists(inkycal.control_socket):
+                os.remove(inkycal.control_socket)
+
+    def test_calibrate_command(self):
+        settings_path = os.path.join(tempfile.mkdtemp(), "settings.json")
+        with open(self.settings_path, encoding="utf-8") as file:
+            config = json.load(file)
+        config.update(image_hash=True, calibration_hours=[])
+        with open(settings_path, mode="w", encoding="utf-8") as file:
+            json.dump(config, file)
+        inkycal = Inkycal(settings_path, render=True)
+        inkycal.control_socket = None
+        inkycal.watch_settings = False
+        cycles, renders = [], []
+
+        async def process_modules():
+            cycles.append(time.monotonic())
+            return [], []
+
+        async def calibrate_async():
+            pass
+
+        async def render_frame(*images):
+            renders.append(len(cycles))
+
+        inkycal._process_modules = process_modules
+        inkycal.Display.calibrate_async = calibrate_async
+        inkycal._render_frame = render_frame
+
+        async def commands():
+            task = asyncio.create_task(inkycal.run())
+            for command in ("calibrate", "refresh"):
+                count = len(cycles)
+                while len(cycles) == count:
+                    await asyncio.sleep(0.05)
+                await asyncio.sleep(0.1)
+                await inkycal._control(command, [])
+            count = len(cycles)
+            while len(cycles) == count:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        try:
+            asyncio.run(asyncio.wait_for(commands(), 60))
+        finally:
+            shutil.rmtree(os.path.dirname(settings_path))
+
+        # the frame is shown again after the calibration, but not in the cycle after that
+        assert renders == [1, 2]
+
+    def test_reload(self):
+        settings_path = os.path.join(tempfile.mkdtemp(), "settings.json")
+        shutil.copy(self.settings_path, settings_path)
+        inkycal = Inkycal(settings_path, render=False)
+        inkycal.control_socket = None
+        inkycal.settings_poll_interval = 0.05
+        modules = dict(inkycal.modules)
+
+        async def process_modules():
+            return [], []
+
+        inkycal._process_modules = process_modules
+
+        async def edit_settings():
+            task = asyncio.create_task(inkycal.run())
+            await asyncio.sleep(0.2)
+
+            with open(settings_path, encoding="utf-8") as file:
+                config = json.load(file)
+            config["modules"] = [module for module in config["modules"] if module["position"] != 3]
+            config["modules"][1]["config"]["fontsize"] += 1
+            with open(settings_path, mode="w", encoding="utf-8") as file:
+                json.dump(config, file)
+
+            while inkycal.modules.get(2) is modules[2]:
+                await asyncio.sleep(0.05)
+            task.cancel()
+
+        try:
+            asyncio.run(asyncio.wait_for(edit_settings(), 60))
+        finally:
+            shutil.rmtree(os.path.dirname(settings_path))
+
+        # only the changed module was created again
+        assert inkycal.modules[1] is modules[1]
+        assert inkycal.modules[2].fontsize == modules[2].fontsize + 1
+        assert sorted(inkycal.modules) == [1, 2]
+        assert sorted(inkycal._layout) == [1, 2]
+
+    def test_reload_invalid(self):
+        settings_path = os.path.join(tempfile.mkdtemp(), "settings.json")
+        shutil.copy(self.settings_path, settings_path)
+        inkycal = Inkycal(settings_path, render=False)
+        inkycal.control_socket = None
+        inkycal.settings_poll_interval = 0.05
+        modules, layout, settings = dict(inkycal.modules), dict(inkycal._layout), dict(inkycal.settings)
+        cycles = []
+
+        async def process_modules():
+            cycles.append(time.monotonic())
+            return [], []
+
+        inkycal._process_modules = process_modules
+
+        async def edit_settings():
+            task = asyncio.create_task(inkycal.run())
+            await asyncio.sleep(0.2)
+
+            count = len(cycles)
+            with open(settings_path, encoding="utf-8") as file:
+                config = json.load(file)
+            config["layout"] = "diagonal"
+            config["modules"][0]["config"]["fontsize"] += 1
+            with open(settings_path, mode="w", encoding="utf-8") as file:
+                json.dump(config, file)
+
+            # the invalid settings are read, then the loop goes on with the next cycle
+            while len(cycles) == count:
+                await asyncio.sleep(0.05)
+            assert not task.done()
+            task.cancel()
+
+        try:
+            asyncio.run(asyncio.wait_for(edit_settings(), 60))
+        finally:
+            shutil.rmtree(os.path.dirname(settings_path))
+
+        # nothing of the invalid settings was applied
+        assert inkycal.settings == settings
+        assert inkycal.modules == modules
+        assert inkycal.modules[1] is modules[1]
+        assert inkycal._layout == layout
+
     def test_countdown(self):
         inkycal = Inkycal(self.settings_path, render=False)
 
@@ -0,0 +1,74 @@
+"""
+Test the memory profiler
+"""
+import os
+import threading
+import tracemalloc
+import unittest
+
+from inkycal.utils import MemoryProfiler, Metrics
+
+
+class TestMemoryProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(name="test_memory_metrics")
+        self.profiler = MemoryProfiler(self.metrics, name="test_memory_report")
+        self.leak = []
+
+    def tearDown(self):
+        tracemalloc.stop()
+        for path in (self.metrics.jsonl_path, self.metrics.prometheus_path, self.profiler.report_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_measure(self):
+        self.metrics.start_cycle()
+        with self.profiler.measure("module_1"):
+            temporary = bytearray(64 * 1024 ** 2)
+            self.leak.append(bytearray(16 * 1024 ** 2))
+            del temporary
+        self.profiler.sample()
+        values = self.metrics.end_cycle()["values"]
+
+        # other threads may allocate memory at the same time, allow some tolerance
+        assert values["module_1_mem_peak"] >= 72 * 1024 ** 2
+        assert 12 * 1024 ** 2 <= values["module_1_mem_retained"] < 24 * 1024 ** 2
+        assert "module_1_rss_delta" in values
+        assert values["rss"] > 0
+
+    def test_concurrent(self):
+        # a measured section does not block other sections, e.g. a module running past its deadline
+        started, finished = threading.Event(), threading.Event()
+
+        def slow_module():
+            with self.profiler.measure("module_1"):
+                started.set()
+                finished.wait(10)
+
+        thread = threading.Thread(target=slow_module)
+        thread.start()
+        started.wait(10)
+        self.metrics.start_cycle()
+        with self.profiler.measure("module_2"):
+            pass
+        assert thread.is_alive()
+        finished.set()
+        thread.join()
+        values = self.metrics.end_cycle()["values"]
+        assert "module_1_mem_peak" in values and "module_2_mem_peak" in values
+
+    def test_report(self):
+        self.profiler.sample()
+        self.leak.append(bytearray(2 * 1024 ** 2))
+        path = self.profiler.write_report(top=5)
+
+        with open(path, encoding="utf-8") as file:
+            report = file.read()
+        assert "Top 5 allocation sites" in report
+        assert "growing allocation sites" in report
+        assert "test_memory_profiler.py" in report
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Test the metrics helper
+"""
+import json
+import os
+import unittest
+
+from inkycal.utils import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(name="test_metrics")
+
+    def tearDown(self):
+        for path in (self.metrics.jsonl_path, self.metrics.prometheus_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_cycle(self):
+        self.metrics.start_cycle()
+        with self.metrics.timer("assemble"):
+            pass
+        self.metrics.record("busy", 1.5)
+        self.metrics.record("busy", 0.5)
+        self.metrics.set("failed_modules", 0)
+        record = self.metrics.end_cycle()
+
+        assert record["stages"]["busy"] == 2.0
+        assert "assemble" in record["stages"]
+        assert set(record["percentiles"]) == {"p50", "p90", "p99"}
+
+        with open(self.metrics.jsonl_path) as file:
+            assert json.loads(file.readlines()[-1]) == record
+
+        with open(self.metrics.prometheus_path) as file:
+            assert 'inkycal_stage_seconds{stage="busy"} 2.0' in file.read()
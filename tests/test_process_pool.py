@@ -0,0 +1,73 @@
+"""
+Test running modules in worker processes
+"""
+import os
+import unittest
+
+from PIL import Image, ImageChops, ImageDraw
+
+from inkycal.modules import register_module
+from inkycal.modules.process_pool import ModuleProcessPool
+from inkycal.modules.template import inkycal_module
+
+config = {
+    "position": 1,
+    "name": "ProcessInfo",
+    "config": {"size": [200, 40], "padding_x": 10, "padding_y": 10, "fontsize": 12, "language": "en"}
+}
+
+
+class ProcessInfo(inkycal_module):
+    """Module drawing the id of the process generating it"""
+
+    name = "ProcessInfo - Show the process id"
+    refresh_interval = 30
+
+    def generate_image(self):
+        im_black = Image.new("RGB", (180, 20), "white")
+        ImageDraw.Draw(im_black).text((0, 0), str(os.getpid()), fill="black", font=self.font)
+        im_colour = Image.new("P", (180, 20), 0)
+        im_colour.putpalette([255, 255, 255, 255, 0, 0])
+        return im_black, im_colour
+
+
+register_module("ProcessInfo", __name__)
+
+
+class TestProcessPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ModuleProcessPool(recycle_after=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_module(self):
+        module = self.pool.module(config)
+        # the worker is only started to generate the first images
+        assert self.pool._executor is None
+
+        black, colour = module.generate_image()
+        assert module.name == ProcessInfo.name
+        assert module.refresh_interval == 30
+        assert black.mode == "RGB" and colour.mode == "P"
+        assert colour.getpalette()[:6] == [255, 255, 255, 255, 0, 0]
+
+        # the image was drawn in another process
+        im_black, _ = ProcessInfo(config).generate_image()
+        assert ImageChops.difference(black, im_black).getbbox() is not None
+
+    def test_recycle(self):
+        module = self.pool.module(config)
+        first, _ = module.generate_image()
+
+        self.pool.next_cycle()
+        assert ImageChops.difference(module.generate_image()[0], first).getbbox() is None
+
+        # the second cycle replaces the worker
+        self.pool.next_cycle()
+        assert ImageChops.difference(module.generate_image()[0], first).getbbox() is not None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+"""
+Cold start benchmark, fails if starting Inkycal takes longer than the budget
+"""
+import unittest
+
+from inkycal.utils.startup_profiler import profile_startup
+from tests import Config
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_cold_start_budget(self):
+        report = profile_startup(Config.TEST_SETTINGS_PATH)
+
+        assert "font discovery (part of import)" in report["stages"]
+        assert all(seconds >= 0 for seconds in report["stages"].values())
+        assert 0 < report["interpreter"] < report["total"]
+        assert report["imports"] and report["packages"]
+        assert {"name", "self", "cumulative"} <= set(report["imports"][0])
+        assert report["total"] <= Config.STARTUP_BUDGET, \
+            f"Cold start took {report['total']:.2f}s, budget is {Config.STARTUP_BUDGET}s"
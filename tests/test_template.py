@@ -0,0 +1,75 @@
+"""
+Test the inkycal module template
+"""
+import unittest
+
+from inkycal.modules.template import inkycal_module
+
+config = {
+    "position": 1,
+    "name": "Counter",
+    "config": {"size": [100, 40], "padding_x": 10, "padding_y": 10, "fontsize": 12, "language": "en"}
+}
+
+
+class Counter(inkycal_module):
+    """Module showing a counter, counting how often it was rendered"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.value = 0
+        self.renders = 0
+
+    def fetch(self):
+        return {"value": self.value}
+
+    def render(self, data):
+        self.renders += 1
+        return self.new_image((80, 20)), self.new_image((80, 20))
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_unchanged_data_is_not_rendered_again(self):
+        module = Counter(config)
+        images = module.generate_image()
+        assert set(module.timings) == {"fetch", "render"}
+        reused = module.generate_image()
+        assert [image.tobytes() for image in reused] == [image.tobytes() for image in images]
+        assert module.renders == 1
+        assert set(module.timings) == {"fetch"}
+
+    def test_images_are_copies(self):
+        module = Counter(config)
+        black, colour = module.generate_image()
+        black.paste("black", (0, 0, 10, 10))
+
+        # drawing on the returned images (e.g. the border) does not change the stored ones
+        assert module.generate_image()[0].getpixel((0, 0)) == (255, 255, 255)
+        assert module.renders == 1
+
+    def test_module_without_images(self):
+        class Incomplete(inkycal_module):
+            def fetch(self):
+                return {}
+
+        with self.assertRaises(TypeError):
+            Incomplete(config)
+
+    def test_changed_data_is_rendered(self):
+        module = Counter(config)
+        images = module.generate_image()
+        module.value = 1
+        assert module.generate_image() is not images
+        assert module.renders == 2
+
+    def test_set_renders_again(self):
+        module = Counter(config)
+        module.generate_image()
+        module.set(fontsize=14)
+        module.generate_image()
+        assert module.renders == 2
+
+
+if __name__ == '__main__':
+    unittest.main()